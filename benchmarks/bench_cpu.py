@@ -0,0 +1,133 @@
+"""CPU benchmarks for parsing, task extraction and analytics.
+
+Times each pipeline stage over synthetic mailboxes, writes the results to
+JSON and optionally compares them against a stored baseline:
+
+    python benchmarks/bench_cpu.py --sizes 1k 10k --output bench_results.json
+    python benchmarks/bench_cpu.py --save-baseline
+    python benchmarks/bench_cpu.py --baseline benchmarks/baseline.json
+
+Exits with status 1 when a stage is slower than the baseline by more than
+the threshold.
+"""
+from datetime import datetime
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), 'src'))
+sys.path.insert(0, BENCH_DIR)
+
+from analytics.email_analyzer import EmailAnalyzer
+from tasks.task_extractor import TaskExtractor
+from tasks.prefilter import BulkMailFilter
+from synthetic_mailbox import SyntheticMailbox, SIZES
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+
+def _best_of(repeat, func, *args):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def run_benchmarks(size: int, repeat: int, seed: int) -> dict:
+    messages = list(SyntheticMailbox(size, seed=seed).messages())
+    analyzer = EmailAnalyzer()
+    extractor = TaskExtractor()
+
+    timings = {}
+    timings['parse_email'], emails = _best_of(
+        repeat, lambda: [analyzer._parse_email(message) for message in messages])
+    timings['extract_tasks'], tasks = _best_of(repeat, extractor.extract_tasks, emails)
+    timings['extract_tasks_body'], _ = _best_of(repeat, TaskExtractor(scan_body=True).extract_tasks, emails)
+    timings['extract_tasks_prefiltered'], _ = _best_of(
+        repeat, lambda: TaskExtractor(bulk_filter=BulkMailFilter(skip_cache_file=None)).extract_tasks(emails))
+    timings['prioritize_tasks'], _ = _best_of(
+        repeat, lambda: extractor.prioritize_tasks([dict(task) for task in tasks]))
+    timings['analyze_response_times'], _ = _best_of(repeat, analyzer.analyze_response_times, emails)
+    timings['analyze_communication_patterns'], _ = _best_of(
+        repeat, analyzer.analyze_communication_patterns, emails)
+    sketch_analyzer = EmailAnalyzer(stats_mode='sketch')
+    timings['analyze_response_times_sketch'], _ = _best_of(
+        repeat, sketch_analyzer.analyze_response_times, emails)
+    timings['analyze_communication_patterns_sketch'], _ = _best_of(
+        repeat, sketch_analyzer.analyze_communication_patterns, emails)
+    timings['generate_email_network'], _ = _best_of(repeat, analyzer.generate_email_network, emails)
+
+    return {
+        'messages': size,
+        'tasks': len(tasks),
+        'seconds': timings,
+        'per_message_us': {name: seconds / size * 1e6 for name, seconds in timings.items()}
+    }
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Return (size, stage, ratio) for every stage slower than baseline by more than threshold."""
+    regressions = []
+    for size, result in results['results'].items():
+        base = baseline.get('results', {}).get(size)
+        if not base:
+            continue
+        for stage, seconds in result['seconds'].items():
+            base_seconds = base['seconds'].get(stage)
+            if not base_seconds:
+                continue
+            ratio = seconds / base_seconds
+            marker = 'REGRESSION' if ratio > 1 + threshold else ''
+            print(f'{size:>6} {stage:<32} {base_seconds:10.4f}s -> {seconds:10.4f}s  x{ratio:5.2f} {marker}')
+            if marker:
+                regressions.append((size, stage, ratio))
+    return regressions
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--sizes', nargs='+', default=['1k', '10k'], choices=list(SIZES))
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--output', default='bench_results.json')
+    arg_parser.add_argument('--baseline', default=None, help='baseline JSON to compare against')
+    arg_parser.add_argument('--save-baseline', action='store_true',
+                            help=f'also write the results to {DEFAULT_BASELINE}')
+    arg_parser.add_argument('--threshold', type=float, default=0.10,
+                            help='allowed slowdown before a stage counts as a regression')
+    args = arg_parser.parse_args()
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'seed': args.seed
+        },
+        'results': {}
+    }
+    for size in args.sizes:
+        print(f'Benchmarking {size} messages...')
+        results['results'][size] = run_benchmarks(SIZES[size], args.repeat, args.seed)
+        for stage, seconds in results['results'][size]['seconds'].items():
+            print(f'  {stage:<32} {seconds:10.4f}s')
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(DEFAULT_BASELINE, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
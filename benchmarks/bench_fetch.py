@@ -0,0 +1,100 @@
+"""End-to-end fetch throughput and latency against the fake Gmail API.
+
+Starts benchmarks/fake_gmail_server.py in-process, points GmailAuth at it
+and streams EmailAnalyzer.iter_emails, reporting messages/second and
+per-batch-request latency percentiles:
+
+    python benchmarks/bench_fetch.py --size 1k --latency-ms 20 --quota-rate 0.02
+"""
+from datetime import datetime, timezone
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), 'src'))
+sys.path.insert(0, BENCH_DIR)
+
+from analytics.email_analyzer import EmailAnalyzer
+from synthetic_mailbox import SyntheticMailbox, SIZES
+from fake_gmail_server import FakeGmailServer
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))
+    return values[index]
+
+def run(args) -> dict:
+    size = SIZES.get(args.size) or int(args.size)
+    mailbox = SyntheticMailbox(size, seed=args.seed, end_date=datetime.now(timezone.utc), days=args.days)
+    server = FakeGmailServer(mailbox, latency_ms=args.latency_ms, latency_jitter_ms=args.latency_jitter_ms,
+                             error_rate=args.error_rate, quota_rate=args.quota_rate, seed=args.seed)
+    server.start_background()
+    os.environ['GMAIL_API_ENDPOINT'] = server.url
+
+    # Keep the email cache out of the working tree
+    os.chdir(tempfile.mkdtemp(prefix='bench_fetch_'))
+    analyzer = EmailAnalyzer()
+    if not analyzer.connect():
+        raise SystemExit('Could not connect to the fake Gmail API')
+
+    latencies = []
+    fetch_batch = analyzer._fetch_batch
+
+    def timed_fetch_batch(msg_ids):
+        start = time.perf_counter()
+        try:
+            return fetch_batch(msg_ids)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    analyzer._fetch_batch = timed_fetch_batch
+
+    start = time.perf_counter()
+    messages = sum(1 for _ in analyzer.iter_emails(months_back=args.months_back, force_refresh=True))
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+    if analyzer.last_error:
+        raise SystemExit(f'Fetch failed: {analyzer.last_error}')
+
+    return {
+        'messages': messages,
+        'seconds': elapsed,
+        'messages_per_second': messages / elapsed if elapsed else 0.0,
+        'batch_latency_ms': {
+            'p50': percentile(latencies, 50) * 1000,
+            'p95': percentile(latencies, 95) * 1000,
+            'p99': percentile(latencies, 99) * 1000,
+            'max': max(latencies, default=0.0) * 1000
+        },
+        'server': server.stats,
+        'config': vars(args)
+    }
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Fetch throughput against the fake Gmail API')
+    arg_parser.add_argument('--size', default='1k')
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--days', type=int, default=60)
+    arg_parser.add_argument('--months-back', type=int, default=2)
+    arg_parser.add_argument('--latency-ms', type=float, default=20.0)
+    arg_parser.add_argument('--latency-jitter-ms', type=float, default=10.0)
+    arg_parser.add_argument('--error-rate', type=float, default=0.0)
+    arg_parser.add_argument('--quota-rate', type=float, default=0.0)
+    arg_parser.add_argument('--output', default=None, help='write results JSON here')
+    args = arg_parser.parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+
+    results = run(args)
+    print(json.dumps({k: v for k, v in results.items() if k != 'config'}, indent=2))
+    if output:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,313 @@
+"""Local stand-in for the Gmail API, backed by a synthetic mailbox.
+
+Implements messages.list, messages.get, users.getProfile, history.list
+and the batch endpoint, with configurable latency, error rate and 429
+quota responses. Point the app at it with GMAIL_API_ENDPOINT:
+
+    python benchmarks/fake_gmail_server.py --size 10k --port 8765 --latency-ms 40 --quota-rate 0.02
+    GMAIL_API_ENDPOINT=http://127.0.0.1:8765/ python src/main.py
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import datetime, timezone
+from email.parser import BytesParser
+from email.policy import HTTP
+from urllib.parse import urlsplit, parse_qs
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_mailbox import SyntheticMailbox, SIZES
+
+MESSAGES_PATH = re.compile(r'^/gmail/v1/users/[^/]+/messages$')
+MESSAGE_PATH = re.compile(r'^/gmail/v1/users/[^/]+/messages/([^/]+)$')
+HISTORY_PATH = re.compile(r'^/gmail/v1/users/[^/]+/history$')
+PROFILE_PATH = re.compile(r'^/gmail/v1/users/[^/]+/profile$')
+BATCH_PATHS = ('/batch/gmail/v1', '/batch')
+MAX_BATCH_SIZE = 100
+
+class FakeGmailServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, mailbox: SyntheticMailbox, host: str = '127.0.0.1', port: int = 0,
+                 latency_ms: float = 0.0, latency_jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 quota_rate: float = 0.0, growth_per_minute: float = 0.0, seed: int = 0):
+        super().__init__((host, port), FakeGmailHandler)
+        self.mailbox = mailbox
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.quota_rate = quota_rate
+        # New messages "arrive" over time so history.list has something to report
+        self.growth_per_minute = growth_per_minute
+        self.initial_size = mailbox.size
+        self.started = time.monotonic()
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'batch_parts': 0, 'errors': 0, 'quota': 0, 'by_method': {}}
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def visible_size(self) -> int:
+        minutes = (time.monotonic() - self.started) / 60
+        return self.initial_size + int(minutes * self.growth_per_minute)
+
+    def start_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def record(self, method: str, batch_part: bool = False):
+        with self.lock:
+            self.stats['requests'] += not batch_part
+            self.stats['batch_parts'] += batch_part
+            self.stats['by_method'][method] = self.stats['by_method'].get(method, 0) + 1
+
+    def inject_fault(self):
+        """Sleep for the configured latency and maybe pick an error: None, 429 or 500."""
+        with self.lock:
+            delay = self.latency_ms + self.rng.uniform(0, self.latency_jitter_ms)
+            roll = self.rng.random()
+        if delay:
+            time.sleep(delay / 1000)
+        if roll < self.quota_rate:
+            with self.lock:
+                self.stats['quota'] += 1
+            return 429
+        if roll < self.quota_rate + self.error_rate:
+            with self.lock:
+                self.stats['errors'] += 1
+            return 500
+        return None
+
+    # API methods. Each returns (status, body dict).
+
+    def list_messages(self, params):
+        size = self.visible_size()
+        first, last = 0, size
+        query = params.get('q', [''])[0]
+        for operator, value in re.findall(r'(after|before):(\d{4}[-/]\d{2}[-/]\d{2})', query):
+            bound = datetime.strptime(value.replace('/', '-'), '%Y-%m-%d').replace(tzinfo=timezone.utc)
+            index = self._first_index_after(bound, size)
+            if operator == 'after':
+                first = max(first, index)
+            else:
+                last = min(last, index)
+
+        label_ids = set(params.get('labelIds', []))
+        excluded = {'CATEGORY_' + name.upper() for name in re.findall(r'-category:(\w+)', query)}
+        indices = range(first, max(first, last))
+        if label_ids or excluded:
+            indices = [i for i in indices
+                       if label_ids <= set(self.mailbox.message(i)['labelIds'])
+                       and not excluded & set(self.mailbox.message(i)['labelIds'])]
+
+        # Newest first, like Gmail
+        indices = list(reversed(indices))
+        offset = int(params.get('pageToken', ['0'])[0] or 0)
+        page_size = min(int(params.get('maxResults', ['100'])[0]), 500)
+        page = indices[offset:offset + page_size]
+
+        body = {
+            'messages': [{'id': self.mailbox.message_id(i),
+                          'threadId': self.mailbox.message_id(self.mailbox._thread_root(i))}
+                         for i in page],
+            'resultSizeEstimate': len(indices)
+        }
+        if offset + page_size < len(indices):
+            body['nextPageToken'] = str(offset + page_size)
+        if not page:
+            del body['messages']
+        return 200, body
+
+    def _first_index_after(self, bound: datetime, size: int) -> int:
+        # Message dates increase with the index, so binary search
+        low, high = 0, size
+        while low < high:
+            mid = (low + high) // 2
+            if self.mailbox._date(mid) < bound:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def get_message(self, msg_id, params):
+        try:
+            index = self.mailbox.message_index(msg_id)
+        except ValueError:
+            index = -1
+        if not 0 <= index < self.visible_size():
+            return 404, {'error': {'code': 404, 'message': 'Requested entity was not found.'}}
+
+        message = self.mailbox.message(index)
+        fmt = params.get('format', ['full'])[0]
+        if fmt == 'minimal':
+            message = {k: v for k, v in message.items() if k != 'payload'}
+        elif fmt == 'metadata':
+            message = dict(message, payload={'mimeType': message['payload']['mimeType'],
+                                             'headers': message['payload']['headers']})
+        return 200, message
+
+    def get_profile(self):
+        size = self.visible_size()
+        return 200, {
+            'emailAddress': 'me@example.com',
+            'messagesTotal': size,
+            'threadsTotal': size,
+            'historyId': str(100000 + size - 1)
+        }
+
+    def list_history(self, params):
+        size = self.visible_size()
+        start = int(params.get('startHistoryId', ['0'])[0]) - 100000 + 1
+        start = max(start, 0)
+        offset = int(params.get('pageToken', ['0'])[0] or 0)
+        page_size = min(int(params.get('maxResults', ['100'])[0]), 500)
+        first = start + offset
+        page = range(first, min(first + page_size, size))
+
+        body = {
+            'history': [{
+                'id': str(100000 + i),
+                'messagesAdded': [{'message': {
+                    'id': self.mailbox.message_id(i),
+                    'threadId': self.mailbox.message(i)['threadId'],
+                    'labelIds': self.mailbox.message(i)['labelIds']
+                }}]
+            } for i in page],
+            'historyId': str(100000 + size - 1)
+        }
+        if first + page_size < size:
+            body['nextPageToken'] = str(offset + page_size)
+        if not body['history']:
+            del body['history']
+        return 200, body
+
+    def dispatch(self, method: str, path: str, params, batch_part: bool = False):
+        """Route one API call, applying fault injection. Returns (status, body dict)."""
+        fault = self.inject_fault()
+        if fault == 429:
+            return 429, {'error': {'code': 429, 'message': 'Quota exceeded',
+                                   'errors': [{'reason': 'rateLimitExceeded'}]}}
+        if fault == 500:
+            return 500, {'error': {'code': 500, 'message': 'Backend Error',
+                                   'errors': [{'reason': 'backendError'}]}}
+
+        if method == 'GET' and MESSAGES_PATH.match(path):
+            self.record('messages.list', batch_part)
+            return self.list_messages(params)
+        match = MESSAGE_PATH.match(path)
+        if method == 'GET' and match:
+            self.record('messages.get', batch_part)
+            return self.get_message(match.group(1), params)
+        if method == 'GET' and HISTORY_PATH.match(path):
+            self.record('history.list', batch_part)
+            return self.list_history(params)
+        if method == 'GET' and PROFILE_PATH.match(path):
+            self.record('users.getProfile', batch_part)
+            return self.get_profile()
+        return 404, {'error': {'code': 404, 'message': f'Unknown method {method} {path}'}}
+
+class FakeGmailHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = 'application/json; charset=UTF-8',
+              headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/_stats':
+            self._send(200, json.dumps(self.server.stats).encode())
+            return
+        status, body = self.server.dispatch('GET', url.path, parse_qs(url.query))
+        headers = {'Retry-After': '1'} if status == 429 else None
+        self._send(status, json.dumps(body).encode(), headers=headers)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length', 0))
+        payload = self.rfile.read(length)
+        if url.path not in BATCH_PATHS:
+            self._send(404, b'{"error": {"code": 404, "message": "Not found"}}')
+            return
+        self._handle_batch(payload)
+
+    def _handle_batch(self, payload: bytes):
+        self.server.record('batch')
+        content_type = self.headers.get('Content-Type', '')
+        message = BytesParser(policy=HTTP).parsebytes(
+            b'Content-Type: ' + content_type.encode() + b'\r\n\r\n' + payload)
+        parts = list(message.iter_parts()) if message.is_multipart() else []
+        if len(parts) > MAX_BATCH_SIZE:
+            self._send(400, json.dumps({'error': {'code': 400, 'message':
+                                                  f'Too many requests in batch ({len(parts)} > {MAX_BATCH_SIZE})'}}).encode())
+            return
+
+        boundary = f'batch_{random.getrandbits(64):016x}'
+        out = []
+        for part in parts:
+            content_id = part.get('Content-ID', '')
+            request_line = part.get_payload(decode=True).decode('utf-8', 'replace').split('\r\n', 1)[0]
+            request_line = request_line.split('\n', 1)[0]
+            method, target = request_line.split(' ')[:2]
+            url = urlsplit(target)
+            status, body = self.server.dispatch(method, url.path, parse_qs(url.query), batch_part=True)
+            body_bytes = json.dumps(body)
+            response_id = content_id.replace('<', '<response-', 1) if content_id else ''
+            out.append(
+                f'--{boundary}\r\n'
+                f'Content-Type: application/http\r\n'
+                f'Content-ID: {response_id}\r\n\r\n'
+                f'HTTP/1.1 {status} {self.responses.get(status, ("",))[0]}\r\n'
+                f'Content-Type: application/json; charset=UTF-8\r\n'
+                f'Content-Length: {len(body_bytes.encode())}\r\n\r\n'
+                f'{body_bytes}\r\n')
+        out.append(f'--{boundary}--\r\n')
+        self._send(200, ''.join(out).encode(), content_type=f'multipart/mixed; boundary={boundary}')
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Local fake Gmail API server')
+    arg_parser.add_argument('--size', default='10k', help='mailbox size: 1k, 10k, 100k or a number')
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--host', default='127.0.0.1')
+    arg_parser.add_argument('--port', type=int, default=8765)
+    arg_parser.add_argument('--latency-ms', type=float, default=0.0)
+    arg_parser.add_argument('--latency-jitter-ms', type=float, default=0.0)
+    arg_parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of calls answered with 500')
+    arg_parser.add_argument('--quota-rate', type=float, default=0.0, help='fraction of calls answered with 429')
+    arg_parser.add_argument('--growth-per-minute', type=float, default=0.0,
+                            help='new messages arriving per minute, reported by history.list')
+    args = arg_parser.parse_args()
+
+    size = SIZES.get(args.size) or int(args.size)
+    # End the synthetic window now so after:/before: queries relative to today match
+    mailbox = SyntheticMailbox(size, seed=args.seed, end_date=datetime.now(timezone.utc))
+    server = FakeGmailServer(mailbox, args.host, args.port, args.latency_ms, args.latency_jitter_ms,
+                             args.error_rate, args.quota_rate, args.growth_per_minute, args.seed)
+    print(f'Fake Gmail API serving {size} messages at {server.url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+"""Deterministic synthetic Gmail mailbox.
+
+Produces Gmail API message resources (as returned by messages.get with
+format=full) with varied headers, multipart bodies, deadline phrasings
+and reply chains. Every message is derived from (seed, index) alone, so
+any message can be generated on demand without holding the mailbox in
+memory.
+"""
+from typing import List, Dict, Iterator, Optional
+from datetime import datetime, timedelta, timezone
+import base64
+import random
+
+SIZES = {'1k': 1000, '10k': 10000, '100k': 100000}
+
+FIRST_NAMES = ['Alice', 'Bob', 'Carol', 'Dave', 'Erin', 'Frank', 'Grace', 'Heidi', 'Ivan', 'Judy',
+               'Mallory', 'Niaj', 'Olivia', 'Peggy', 'Rupert', 'Sybil', 'Trent', 'Victor', 'Walter', 'Yara']
+LAST_NAMES = ['Smith', 'Jones', 'Garcia', 'Chen', 'Patel', 'Kowalski', 'Nguyen', 'Okafor', 'Silva', 'Berg']
+DOMAINS = ['example.com', 'corp.example.org', 'mail.example.net', 'partner.example.io']
+NEWSLETTERS = [('Weekly Digest', 'digest@news.example.com'), ('Product Updates', 'updates@saas.example.com'),
+               ('Deals', 'offers@shop.example.com'), ('Community', 'noreply@forum.example.org')]
+NOTIFIERS = [('CI Bot', 'ci@builds.example.com'), ('Calendar', 'calendar-notification@example.com'),
+             ('Tracker', 'notifications@tracker.example.com')]
+
+SUBJECTS = [
+    'Quarterly report review', 'Project kickoff meeting', 'Client feedback on proposal',
+    'Budget approval needed', 'Action required: access renewal', 'Team offsite planning',
+    'Please review the design doc', 'Follow up on last call', 'Invoice #{n}', 'Release checklist',
+    'Can you update the roadmap?', 'Urgent: production incident', 'Lunch next week?',
+    'Contract draft for {client}', 'Interview schedule', 'Status update', 'Onboarding tasks',
+]
+CLIENTS = ['Acme', 'Globex', 'Initech', 'Umbrella', 'Hooli', 'Stark']
+
+SENTENCES = [
+    'Thanks for the update on the project.',
+    'I have attached the latest numbers for your reference.',
+    'Let me know if you have any questions.',
+    'We discussed this briefly in the standup this morning.',
+    'The client asked for a few changes to the scope.',
+    'Please review the attached document and share your feedback.',
+    'Can you prepare the slides for the meeting?',
+    'We need to finalize the budget before the board meeting.',
+    'Could you check whether the integration tests are passing?',
+    'I will coordinate with the design team on the mockups.',
+    'This is an important item for the quarter.',
+    'Nothing urgent here, just keeping you in the loop.',
+]
+DEADLINE_PHRASES = [
+    'This is due by {written}.',
+    'The deadline is {formal}.',
+    'Please submit by end of day.',
+    'We need this by tomorrow.',
+    'Can you finish this by next Friday?',
+    'Must be completed by {written}, no later than EOD.',
+    'Please send it over in {n} days.',
+    'Required by close of business {weekday}.',
+    'Let us aim for this coming week.',
+    'ASAP please, this is time sensitive.',
+]
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+FOOTER = ('\n\n--\nYou are receiving this email because you subscribed to our newsletter.\n'
+          'Unsubscribe | Manage preferences | 123 Example Street\n')
+
+def _encode(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode('utf-8')).decode('ascii')
+
+class SyntheticMailbox:
+    def __init__(self, size: int, seed: int = 0, end_date: Optional[datetime] = None,
+                 days: int = 60, num_contacts: int = 300):
+        self.size = size
+        self.seed = seed
+        self.end_date = end_date or datetime(2025, 3, 1, tzinfo=timezone.utc)
+        self.days = days
+        # Fixed spacing so dates stay stable if the mailbox later grows past size
+        self.interval = timedelta(days=days).total_seconds() / max(size, 1)
+        self.initial_size = size
+        rng = random.Random(seed)
+        self.contacts = []
+        for _ in range(num_contacts):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            address = f'{first.lower()}.{last.lower()}{rng.randint(1, 99)}@{rng.choice(DOMAINS)}'
+            self.contacts.append((f'{first} {last}', address))
+
+    @staticmethod
+    def message_id(index: int) -> str:
+        return f'{index + 1:016x}'
+
+    @staticmethod
+    def message_index(msg_id: str) -> int:
+        return int(msg_id, 16) - 1
+
+    def _rng(self, index: int) -> random.Random:
+        return random.Random(self.seed * 1000003 + index)
+
+    def _date(self, index: int) -> datetime:
+        # Messages are spread evenly over the window, newest last
+        jitter = self._rng(index).uniform(0, min(600, self.interval))
+        return self.end_date - timedelta(seconds=(self.initial_size - index) * self.interval - jitter)
+
+    def _kind(self, rng: random.Random) -> str:
+        roll = rng.random()
+        if roll < 0.35:
+            return 'newsletter'
+        if roll < 0.5:
+            return 'notification'
+        if roll < 0.75:
+            return 'reply'
+        return 'personal'
+
+    def _subject(self, rng: random.Random) -> str:
+        return rng.choice(SUBJECTS).format(n=rng.randint(1000, 9999), client=rng.choice(CLIENTS))
+
+    def _thread_root(self, index: int) -> int:
+        """Index of the message that started the thread of message index."""
+        while True:
+            rng = self._rng(index)
+            if self._kind(rng) != 'reply' or index == 0:
+                return index
+            index = max(0, index - rng.randint(1, 25))
+
+    def _format_date(self, date: datetime, rng: random.Random) -> str:
+        style = rng.random()
+        if style < 0.7:
+            return date.strftime('%a, %d %b %Y %H:%M:%S %z')
+        if style < 0.85:
+            return date.strftime('%d %b %Y %H:%M:%S %z')
+        return date.strftime('%a, %d %b %Y %H:%M:%S %z') + ' (UTC)'
+
+    def _deadline(self, rng: random.Random, date: datetime) -> str:
+        due = date + timedelta(days=rng.randint(1, 40))
+        return rng.choice(DEADLINE_PHRASES).format(
+            written=f'{MONTHS[due.month - 1]} {due.day}',
+            formal=due.strftime('%m/%d/%Y'),
+            weekday=rng.choice(WEEKDAYS),
+            n=rng.randint(2, 10))
+
+    def _text(self, rng: random.Random, date: datetime, sentences: int) -> str:
+        lines = [rng.choice(SENTENCES) for _ in range(sentences)]
+        if rng.random() < 0.5:
+            lines.insert(rng.randint(0, len(lines)), self._deadline(rng, date))
+        return ' '.join(lines)
+
+    def _payload(self, rng: random.Random, headers: List[Dict], text: str, html_only: bool,
+                 attachment: bool) -> Dict:
+        html = '<html><body><p>' + text.replace('\n', '<br>') + '</p></body></html>'
+        if html_only:
+            payload = {'mimeType': 'text/html', 'body': {'size': len(html), 'data': _encode(html)}}
+        elif rng.random() < 0.4:
+            payload = {'mimeType': 'text/plain', 'body': {'size': len(text), 'data': _encode(text)}}
+        else:
+            payload = {'mimeType': 'multipart/alternative', 'body': {'size': 0}, 'parts': [
+                {'partId': '0', 'mimeType': 'text/plain', 'headers': [],
+                 'body': {'size': len(text), 'data': _encode(text)}},
+                {'partId': '1', 'mimeType': 'text/html', 'headers': [],
+                 'body': {'size': len(html), 'data': _encode(html)}},
+            ]}
+
+        if attachment:
+            payload = {'mimeType': 'multipart/mixed', 'body': {'size': 0}, 'parts': [
+                dict(payload, partId='0', headers=[]),
+                {'partId': '1', 'mimeType': 'application/pdf', 'filename': 'report.pdf', 'headers': [],
+                 'body': {'size': 48213, 'attachmentId': f'att-{rng.randint(0, 10**9)}'}},
+            ]}
+
+        payload['headers'] = headers
+        return payload
+
+    def message(self, index: int) -> Dict:
+        """Gmail API message resource for the message at index."""
+        rng = self._rng(index)
+        kind = self._kind(rng)
+        date = self._date(index)
+        labels = ['INBOX']
+        headers = []
+
+        if kind == 'newsletter':
+            name, address = rng.choice(NEWSLETTERS)
+            subject = f'{name}: {rng.choice(SUBJECTS).format(n=index, client=rng.choice(CLIENTS))}'
+            text = self._text(rng, date, rng.randint(20, 80)) + FOOTER
+            headers += [{'name': 'List-Unsubscribe', 'value': f'<mailto:unsubscribe@{address.split("@")[1]}>'},
+                        {'name': 'Precedence', 'value': 'bulk'}]
+            labels.append(rng.choice(['CATEGORY_PROMOTIONS', 'CATEGORY_UPDATES', 'CATEGORY_SOCIAL']))
+            html_only = rng.random() < 0.6
+        elif kind == 'notification':
+            name, address = rng.choice(NOTIFIERS)
+            subject = f'[{name}] {self._subject(rng)}'
+            text = self._text(rng, date, rng.randint(2, 6))
+            headers.append({'name': 'Auto-Submitted', 'value': 'auto-generated'})
+            labels.append('CATEGORY_UPDATES')
+            html_only = rng.random() < 0.3
+        else:
+            name, address = rng.choice(self.contacts)
+            text = self._text(rng, date, rng.randint(3, 15))
+            labels.append('CATEGORY_PERSONAL')
+            html_only = rng.random() < 0.1
+            if kind == 'reply' and index > 0:
+                root = self._thread_root(index)
+                subject = 'Re: ' + self._subject(self._rng(root))
+                parent = self.message(max(0, index - rng.randint(1, 25))) if rng.random() < 0.2 else None
+                quoted = parent['snippet'] if parent else rng.choice(SENTENCES)
+                attribution = f'On {self._date(root).strftime("%a, %b %d, %Y at %I:%M %p")} ' \
+                              f'{rng.choice(self.contacts)[0]} wrote:'
+                text += '\n\n' + attribution + '\n' + '\n'.join('> ' + line for line in quoted.split('. '))
+            else:
+                subject = self._subject(rng)
+            if rng.random() < 0.1:
+                subject = 'Fwd: ' + subject
+                text = '---------- Forwarded message ---------\n' + text
+
+        thread_index = self._thread_root(index) if kind == 'reply' else index
+        if rng.random() < 0.3:
+            labels.append('UNREAD')
+        if rng.random() < 0.05:
+            labels.append('IMPORTANT')
+
+        from_value = f'{name} <{address}>' if rng.random() < 0.85 else address
+        headers = [
+            {'name': 'Date', 'value': self._format_date(date, rng)},
+            {'name': 'From', 'value': from_value},
+            {'name': 'To', 'value': 'me@example.com'},
+            {'name': 'Subject', 'value': subject},
+            {'name': 'Message-ID', 'value': f'<{self.message_id(index)}@mail.example.com>'},
+        ] + headers
+
+        payload = self._payload(rng, headers, text, html_only, attachment=rng.random() < 0.1)
+        return {
+            'id': self.message_id(index),
+            'threadId': self.message_id(thread_index),
+            'labelIds': labels,
+            'snippet': ' '.join(text.split())[:200],
+            'historyId': str(100000 + index),
+            'internalDate': str(int(date.timestamp() * 1000)),
+            'sizeEstimate': len(text) + 1024,
+            'payload': payload,
+        }
+
+    def messages(self) -> Iterator[Dict]:
+        for index in range(self.size):
+            yield self.message(index)
@@ -0,0 +1,117 @@
+"""Process several Gmail accounts in parallel and merge the results.
+
+Each account runs in its own process with its own token, email cache,
+task store, rollup and message quota, so the total run takes about as
+long as the slowest account.
+"""
+from typing import List, Dict, Optional
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from analytics.email_analyzer import EmailAnalyzer
+from analytics.rollup import RollupStore
+from auth.gmail_auth import GmailAuth
+from tasks.task_extractor import TaskExtractor
+from tasks.task_store import TaskStore
+from tasks.prefilter import BulkMailFilter
+from tasks.dedup import TaskDeduplicator
+from pipeline.ingest import ingest_emails
+import os
+
+def account_file(path: str, account: str) -> str:
+    """Per-account variant of a store path, e.g. tasks.db -> tasks_me@example.com.db."""
+    root, extension = os.path.splitext(path)
+    return f'{root}_{GmailAuth.safe_name(account)}{extension}'
+
+def process_account(account: str, months_back: int = 2, query: str = '',
+                    max_messages: Optional[int] = None, scan_body: bool = False,
+                    prefilter: bool = True, stats_mode: str = 'exact', dedup: bool = True,
+                    filters: Optional[Dict] = None, max_reextract: Optional[int] = None,
+                    task_db: str = 'tasks.db', rollup_db: str = 'rollup.db') -> Dict:
+    """Sync and extract one account. Runs in a worker process, so everything returned must pickle."""
+    result = {'account': account, 'error': None, 'emails': 0, 'tasks': [],
+              'response_time_counts': None, 'pattern_counts': None, 'week_over_week': None}
+
+    email_analyzer = EmailAnalyzer(account=account, stats_mode=stats_mode)
+    if not email_analyzer.connect(interactive=False):
+        result['error'] = 'auth'
+        return result
+
+    emails = email_analyzer.iter_emails(months_back=months_back, force_refresh=True,
+                                        query=query, max_messages=max_messages, filters=filters)
+    bulk_filter = BulkMailFilter(f'sender_skip_cache_{GmailAuth.safe_name(account)}.json') if prefilter else None
+    task_extractor = TaskExtractor(scan_body=scan_body, bulk_filter=bulk_filter,
+                                   deduplicator=TaskDeduplicator() if dedup else None)
+    stats = email_analyzer.new_stats()
+    task_store = TaskStore(account_file(task_db, account))
+    rollup = RollupStore(account_file(rollup_db, account))
+    try:
+        message_ids = ingest_emails(emails, task_extractor, task_store, stats, sinks=[rollup.add_emails],
+                                    max_reextract=max_reextract)
+        if email_analyzer.last_error:
+            result['error'] = f'fetch: {email_analyzer.last_error}'
+            return result
+        tasks = task_extractor.load_stored_tasks(message_ids, task_store)
+        week_over_week = rollup.week_over_week()
+    finally:
+        task_store.close()
+        rollup.close()
+    for task in tasks:
+        task['account'] = account
+
+    result.update({
+        'emails': len(message_ids),
+        'tasks': tasks,
+        'response_time_counts': stats.response_time_counts(),
+        'pattern_counts': stats.pattern_counts,
+        'week_over_week': week_over_week
+    })
+    return result
+
+def merge_week_over_week(results: List[Dict]) -> Dict:
+    """Add up RollupStore.week_over_week results and recompute the change."""
+    this_week = sum(r['this_week'] for r in results)
+    last_week = sum(r['last_week'] for r in results)
+    merged = {'this_week': this_week, 'last_week': last_week}
+    if last_week:
+        merged['change'] = (this_week - last_week) / last_week
+    return merged
+
+def merge_results(results: List[Dict]) -> Dict:
+    """Combine per-account results into one task list and one set of analytics."""
+    succeeded = [r for r in results if not r['error']]
+    tasks = [task for r in succeeded for task in r['tasks']]
+    patterns = EmailAnalyzer.summarize_patterns(
+        EmailAnalyzer.merge_pattern_counts([r['pattern_counts'] for r in succeeded]))
+    patterns['week_over_week'] = merge_week_over_week([r['week_over_week'] for r in succeeded])
+    return {
+        'tasks': TaskExtractor().prioritize_tasks(tasks),
+        'response_times': EmailAnalyzer.summarize_response_times(
+            EmailAnalyzer.merge_response_counts([r['response_time_counts'] for r in succeeded])),
+        'patterns': patterns,
+        'emails': sum(r['emails'] for r in succeeded),
+        'errors': {r['account']: r['error'] for r in results if r['error']}
+    }
+
+def run_accounts(accounts: List[str], months_back: int = 2, query: str = '',
+                 max_messages: Optional[int] = None, max_workers: Optional[int] = None,
+                 scan_body: bool = False, prefilter: bool = True, stats_mode: str = 'exact',
+                 dedup: bool = True, filters: Optional[Dict] = None,
+                 max_reextract: Optional[int] = None, task_db: str = 'tasks.db',
+                 rollup_db: str = 'rollup.db') -> Dict:
+    """Process accounts in a process pool and return the merged view.
+
+    Each account gets its own task store and rollup next to task_db and rollup_db (see account_file).
+    """
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers or len(accounts)) as executor:
+        futures = {executor.submit(process_account, account, months_back, query, max_messages,
+                                   scan_body, prefilter, stats_mode, dedup, filters, max_reextract,
+                                   task_db, rollup_db): account
+                   for account in accounts}
+        for future in as_completed(futures):
+            account = futures[future]
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f'Error processing {account}: {e}')
+                results.append({'account': account, 'error': str(e), 'emails': 0, 'tasks': []})
+    return merge_results(results)
@@ -1,168 +1,469 @@
-import pandas as pd
-import networkx as nx
-import plotly.graph_objects as go
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
 from auth.gmail_auth import GmailAuth
+from auth.session import get_session
+from googleapiclient.http import BatchHttpRequest
+from googleapiclient.errors import HttpError
+from metrics.profiler import profiler
+from tasks.body_scanner import html_to_text
+from analytics.email_dates import parse_email_date
+from analytics.query_planner import plan_query
+from analytics.sketches import SpaceSaving, HyperLogLog, QuantileSketch
+from tasks.quote_stripper import thread_key
 from functools import lru_cache
+from collections import OrderedDict
 import pickle
+import json
 import os
 import base64
+import hashlib
 
 class EmailAnalyzer:
-    def __init__(self):
-        self.auth = GmailAuth()
+    MAX_BODY_CHARS = 50000  # Cap on text kept from HTML-only bodies
+
+    def __init__(self, account: Optional[str] = None, stats_mode: str = 'exact', stats_error: float = 0.01):
+        self.account = account
+        # 'exact' keeps every sender and response time; 'sketch' bounds memory with
+        # mergeable sketches whose error is controlled by stats_error
+        self.stats_mode = stats_mode
+        self.stats_error = stats_error
+        self.auth = GmailAuth(account)
         self.service = None
-        self.cache_file = 'email_cache.pkl'
-        self.batch_size = 100  # Process emails in batches of 100
-        self.email_cache = self._load_cache()
-
-    def _load_cache(self) -> Dict:
-        if os.path.exists(self.cache_file):
-            try:
-                with open(self.cache_file, 'rb') as f:
-                    return pickle.load(f)
-            except:
-                return {}
-        return {}
-
-    def _save_cache(self):
-        with open(self.cache_file, 'wb') as f:
-            pickle.dump(self.email_cache, f)
-
-    def connect(self) -> bool:
-        if self.auth.authenticate():
-            self.service = self.auth.get_service()
+        # Each account keeps its own email cache
+        self.cache_dir = f'email_cache_{GmailAuth.safe_name(account)}' if account else 'email_cache'
+        self.batch_size = 100  # Messages per list page and batch request (the Gmail batch limit is 100)
+        self.num_retries = 3  # Retries with exponential backoff on 429 and 5xx responses
+        self.last_error = None
+        self.last_history_id = None  # Where the next iter_new_emails starts
+        self.history_expired = False
+
+    def _cache_path(self, cache_key: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha1(cache_key.encode('utf-8')).hexdigest()[:16] + '.frames')
+
+    @staticmethod
+    def _read_cache(path: str) -> Iterator[Dict]:
+        # The cache is a sequence of pickled batches, so reading it never holds more than one batch
+        with open(path, 'rb') as f:
+            while True:
+                try:
+                    batch = pickle.load(f)
+                except EOFError:
+                    return
+                yield from batch
+
+    def connect(self, interactive: bool = True) -> bool:
+        # Shares one authenticated service per account across the process
+        session = get_session(self.account, interactive=interactive)
+        if session:
+            self.auth = session.auth
+            self.service = session.service
             return True
         return False
 
-    def fetch_emails(self, months_back: int = 2, force_refresh: bool = False) -> List[Dict]:
+    @staticmethod
+    def plan(months_back: int = 2, query: str = '', filters: Optional[Dict] = None) -> Dict:
+        """messages.list arguments for the fetch window, query and query_planner filters."""
+        plan_filters = {'months_back': months_back, 'query': query}
+        plan_filters.update(filters or {})
+        return plan_query(plan_filters)
+
+    def _list_messages(self, plan: Dict, **kwargs) -> Dict:
+        if plan['labelIds']:
+            kwargs['labelIds'] = plan['labelIds']
+        results = self.service.users().messages().list(
+            userId='me', q=plan['q'], **kwargs).execute(num_retries=self.num_retries)
+        profiler.count('api_calls', method='messages.list')
+        return results
+
+    def estimate_count(self, months_back: int = 2, query: str = '', filters: Optional[Dict] = None) -> Optional[int]:
+        """Gmail's resultSizeEstimate for a fetch, without downloading any messages."""
         if not self.service:
-            return []
-
-        cache_key = f'emails_{months_back}'
-        if not force_refresh and cache_key in self.email_cache:
-            # Check if cache is from today
-            now = datetime.now()
-            if now.date() > datetime.fromtimestamp(os.path.getmtime(self.cache_file)).date():
-                force_refresh = True
-
-        if force_refresh or cache_key not in self.email_cache:
-            date_from = (datetime.now() - pd.Timedelta(days=30*months_back))
-            # Use RFC3339 format for more precise date filtering
-            date_str = date_from.strftime('%Y-%m-%d')
-            query = f'after:{date_str}'
-
-            try:
-                results = self.service.users().messages().list(
-                    userId='me', q=query).execute()
-                messages = results.get('messages', [])
-                
-                # Process emails in batches
-                all_emails = []
-                for i in range(0, len(messages), self.batch_size):
-                    batch = messages[i:i + self.batch_size]
-                    batch_emails = [self._get_email_data(msg['id']) for msg in batch]
-                    all_emails.extend(batch_emails)
-
-                # Cache the results
-                self.email_cache[cache_key] = all_emails
-                self._save_cache()
-                
-                return all_emails
-            except Exception as e:
-                print(f'Error fetching emails: {e}')
-                return []
-        
-        return self.email_cache[cache_key]
+            return None
+        try:
+            return self._list_messages(self.plan(months_back, query, filters), maxResults=1).get('resultSizeEstimate')
+        except Exception as e:
+            print(f'Error estimating message count: {e}')
+            self.last_error = e
+            return None
+
+    @profiler.timed('fetch_emails')
+    def fetch_emails(self, months_back: int = 2, force_refresh: bool = False, query: str = '',
+                     max_messages: Optional[int] = None, filters: Optional[Dict] = None) -> List[Dict]:
+        """All of iter_emails as a list, or [] on error. Prefer iter_emails for large windows."""
+        emails = list(self.iter_emails(months_back, force_refresh, query, max_messages, filters))
+        return [] if self.last_error else emails
+
+    def iter_emails(self, months_back: int = 2, force_refresh: bool = False, query: str = '',
+                    max_messages: Optional[int] = None, filters: Optional[Dict] = None) -> Iterator[Dict]:
+        """Yield emails from the last months_back months, newest first, optionally narrowed by a Gmail search query.
+
+        filters (see analytics.query_planner) are pushed down into the
+        messages.list call, so filtered-out mail is never downloaded.
+        Messages are fetched and cached one batch at a time, so memory stays
+        bounded by batch_size. force_refresh neither reads nor writes the cache.
+        max_messages caps how many messages are fetched, e.g. as a per-account
+        quota. Errors end the iteration and are left in last_error.
+        """
+        self.last_error = None
+        if not self.service:
+            return
+
+        try:
+            plan = self.plan(months_back, query, filters)
+        except ValueError as e:
+            print(f'Invalid fetch filters: {e}')
+            self.last_error = e
+            return
+        cache_key = f'emails_{plan["q"]}_{",".join(plan["labelIds"])}'
+        if max_messages:
+            cache_key += f'_max{max_messages}'
+        cache_path = self._cache_path(cache_key)
+        # Cached results are only reused on the day they were fetched
+        cached = (not force_refresh and os.path.exists(cache_path) and
+                  datetime.fromtimestamp(os.path.getmtime(cache_path)).date() == datetime.now().date())
+        profiler.cache_lookup('email_cache', hit=cached)
+        # The span covers the whole stream, including the time consumers spend between batches
+        with profiler.span('iter_emails'):
+            if cached:
+                yield from self._read_cache(cache_path)
+            elif force_refresh:
+                yield from self._iter_fetched(plan, max_messages)
+            else:
+                yield from self._iter_fetched(plan, max_messages, cache_path)
+
+    def _iter_fetched(self, plan: Dict, max_messages: Optional[int], cache_path: Optional[str] = None) -> Iterator[Dict]:
+        """Fetch plan's messages, writing them to cache_path if given."""
+        tmp_path = None
+        try:
+            if cache_path is None:
+                for batch in self._iter_batches(plan, max_messages):
+                    yield from batch
+                return
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = cache_path + '.tmp'
+            with open(tmp_path, 'wb') as cache:
+                for batch in self._iter_batches(plan, max_messages):
+                    pickle.dump(batch, cache, pickle.HIGHEST_PROTOCOL)
+                    yield from batch
+            # Only a complete fetch becomes the cache
+            os.replace(tmp_path, cache_path)
+            self._prune_cache()
+        except Exception as e:
+            print(f'Error fetching emails: {e}')
+            self.last_error = e
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _prune_cache(self):
+        """Delete cache files from earlier days; they are never read again."""
+        today = datetime.now().date()
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith('.frames') and datetime.fromtimestamp(os.path.getmtime(path)).date() != today:
+                os.remove(path)
+
+    def history_id(self) -> Optional[str]:
+        """The mailbox's current historyId. Take it before a full fetch to start delta syncs from."""
+        try:
+            profile = self.service.users().getProfile(userId='me').execute(num_retries=self.num_retries)
+            profiler.count('api_calls', method='users.getProfile')
+            return profile['historyId']
+        except Exception as e:
+            print(f'Error reading mailbox history ID: {e}')
+            self.last_error = e
+            return None
+
+    def iter_new_emails(self, start_history_id: str, query: str = '',
+                        filters: Optional[Dict] = None) -> Iterator[Dict]:
+        """Yield emails added since start_history_id, found through history.list instead of relisting the window.
+
+        Afterwards last_history_id is where the next delta sync starts. If Gmail
+        no longer keeps history that old, history_expired is set and a full
+        fetch is needed. Errors end the iteration and are left in last_error.
+        """
+        self.last_error = None
+        self.history_expired = False
+        if not self.service:
+            return
+
+        try:
+            msg_ids = []
+            seen = set()
+            page_token = None
+            while True:
+                results = self.service.users().history().list(
+                    userId='me', startHistoryId=start_history_id, historyTypes=['messageAdded'],
+                    pageToken=page_token, maxResults=self.batch_size).execute(num_retries=self.num_retries)
+                profiler.count('api_calls', method='history.list')
+                for record in results.get('history', []):
+                    for added in record.get('messagesAdded', []):
+                        message = added['message']
+                        if message['id'] not in seen and 'DRAFT' not in message.get('labelIds', []):
+                            seen.add(message['id'])
+                            msg_ids.append(message['id'])
+                page_token = results.get('nextPageToken')
+                if not page_token:
+                    break
+            history_id = results.get('historyId', start_history_id)
+
+            # history.list cannot search, so keep only new messages the fetch query would list
+            plan = self.plan(0, query, filters)
+            if msg_ids and (plan['q'] or plan['labelIds']):
+                msg_ids = self._matching(plan, msg_ids)
+            for start in range(0, len(msg_ids), self.batch_size):
+                yield from self._fetch_batch(msg_ids[start:start + self.batch_size])
+            self.last_history_id = history_id
+        except HttpError as e:
+            self.history_expired = e.resp.status == 404
+            print(f'Error fetching new emails: {e}')
+            self.last_error = e
+        except Exception as e:
+            print(f'Error fetching new emails: {e}')
+            self.last_error = e
+
+    def _matching(self, plan: Dict, msg_ids: List[str]) -> List[str]:
+        """The msg_ids that messages.list returns for plan."""
+        wanted = set(msg_ids)
+        matching = set()
+        page_token = None
+        # New mail is listed first, so the first pages cover it
+        for _ in range(len(msg_ids) // self.batch_size + 1):
+            results = self._list_messages(plan, pageToken=page_token, maxResults=self.batch_size)
+            matching.update(m['id'] for m in results.get('messages', []) if m['id'] in wanted)
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
+        return [msg_id for msg_id in msg_ids if msg_id in matching]
+
+    def _iter_batches(self, plan: Dict, max_messages: Optional[int]) -> Iterator[List[Dict]]:
+        """Page through messages.list and fetch each page of messages as one batch."""
+        remaining = max_messages or None
+        page_token = None
+        while True:
+            results = self._list_messages(plan, pageToken=page_token, maxResults=self.batch_size)
+            messages = results.get('messages', [])
+            if remaining is not None:
+                messages = messages[:remaining]
+                remaining -= len(messages)
+            if messages:
+                yield self._fetch_batch([message['id'] for message in messages])
+            page_token = results.get('nextPageToken')
+            if not page_token or remaining == 0:
+                break
+
+    def _new_batch(self, callback) -> BatchHttpRequest:
+        if self.auth.api_endpoint:
+            # The discovery document's batch URI always points at googleapis.com
+            return BatchHttpRequest(callback=callback,
+                                    batch_uri=self.auth.api_endpoint.rstrip('/') + '/batch/gmail/v1')
+        return self.service.new_batch_http_request(callback=callback)
+
+    @profiler.timed('fetch_batch')
+    def _fetch_batch(self, msg_ids: List[str]) -> List[Dict]:
+        """Fetch messages in one batch request, in msg_ids order.
+
+        Messages whose part of the batch failed (e.g. 429) are fetched one by
+        one with retries and backoff.
+        """
+        responses = {}
+
+        def collect(request_id, response, exception):
+            if exception is None:
+                responses[request_id] = response
+
+        batch = self._new_batch(collect)
+        for msg_id in msg_ids:
+            batch.add(self.service.users().messages().get(userId='me', id=msg_id, format='full'),
+                      request_id=msg_id)
+        try:
+            batch.execute()
+            profiler.count('api_calls', method='batch')
+        except Exception as e:
+            print(f'Batch request failed, fetching messages one by one: {e}')
+
+        emails = []
+        for msg_id in msg_ids:
+            email = responses.pop(msg_id, None)
+            if email is None:
+                emails.append(self._get_email_data(msg_id))
+                continue
+            if profiler.enabled:
+                profiler.count('api_calls', method='messages.get')
+                profiler.count('api_bytes', len(json.dumps(email)), method='messages.get')
+            emails.append(self._parse_email(email))
+        return emails
 
     @lru_cache(maxsize=1000)
+    @profiler.timed('get_email_data')
     def _get_email_data(self, msg_id: str) -> Dict:
         email = self.service.users().messages().get(
-            userId='me', id=msg_id, format='full').execute()
+            userId='me', id=msg_id, format='full').execute(num_retries=self.num_retries)
+        if profiler.enabled:
+            profiler.count('api_calls', method='messages.get')
+            profiler.count('api_bytes', len(json.dumps(email)), method='messages.get')
+        return self._parse_email(email)
+
+    @profiler.timed('parse_email')
+    def _parse_email(self, email: Dict) -> Dict:
+        """Turn a Gmail API message resource (format=full) into an email dict."""
         headers = email['payload']['headers']
+        # Headers the bulk-mail pre-filter looks at
+        optional_headers = {h['name'].lower(): h['value'] for h in headers
+                            if h['name'].lower() in ('list-unsubscribe', 'precedence', 'auto-submitted')}
         
-        # Get email body content
-        body = ''
-        if 'parts' in email['payload']:
-            for part in email['payload']['parts']:
-                if part['mimeType'] == 'text/plain':
-                    body = base64.urlsafe_b64decode(part['body']['data']).decode('utf-8')
-                    break
-        elif 'body' in email['payload'] and 'data' in email['payload']['body']:
-            body = base64.urlsafe_b64decode(email['payload']['body']['data']).decode('utf-8')
+        # Get email body content, falling back to the HTML part for HTML-only mail
+        bodies = {}
+        self._collect_bodies(email['payload'], bodies)
+        body = bodies.get('text/plain', '')
+        if not body and 'text/html' in bodies:
+            body = html_to_text(bodies['text/html'], max_chars=self.MAX_BODY_CHARS)
         
         return {
             'id': email['id'],
+            'thread_id': email.get('threadId', ''),
             'date': next(h['value'] for h in headers if h['name'] == 'Date'),
             'from': next(h['value'] for h in headers if h['name'] == 'From'),
             'subject': next(h['value'] for h in headers if h['name'] == 'Subject'),
             'snippet': email['snippet'],
-            'body': body
+            'body': body,
+            'labels': email.get('labelIds', []),
+            'list_unsubscribe': optional_headers.get('list-unsubscribe', ''),
+            'precedence': optional_headers.get('precedence', ''),
+            'auto_submitted': optional_headers.get('auto-submitted', '')
         }
 
+    def _collect_bodies(self, part: Dict, bodies: Dict):
+        """Record the first text/plain and text/html body in a (possibly nested) MIME tree."""
+        mime_type = part.get('mimeType', '')
+        data = part.get('body', {}).get('data')
+        if data and mime_type in ('text/plain', 'text/html') and mime_type not in bodies:
+            if not part.get('filename'):
+                bodies[mime_type] = base64.urlsafe_b64decode(data).decode('utf-8', errors='replace')
+        for child in part.get('parts', []):
+            self._collect_bodies(child, bodies)
+
+    def new_stats(self) -> 'EmailStats':
+        return EmailStats(self.stats_mode, self.stats_error)
+
+    @profiler.timed('analyze_stream')
+    def analyze_stream(self, emails: Iterable[Dict]) -> Tuple[Dict, Dict]:
+        """Response times and communication patterns in one pass over an email iterator."""
+        stats = self.new_stats()
+        stats.add_all(emails)
+        return stats.response_times(), stats.patterns()
+
+    @profiler.timed('analyze_response_times')
     def analyze_response_times(self, emails: List[Dict]) -> Dict:
-        response_times = []
-        email_threads = {}
+        return self.summarize_response_times(self.count_response_times(emails))
 
-        for email in emails:
-            subject = email['subject']
-            if 'Re:' in subject:
-                base_subject = subject.replace('Re:', '').strip()
-                if base_subject in email_threads:
-                    email_threads[base_subject].append({
-                        'date': datetime.strptime(email['date'], '%a, %d %b %Y %H:%M:%S %z'),
-                        'from': email['from']
-                    })
-
-        for thread in email_threads.values():
-            if len(thread) > 1:
-                thread.sort(key=lambda x: x['date'])
-                for i in range(1, len(thread)):
-                    response_time = (thread[i]['date'] - thread[i-1]['date']).total_seconds() / 3600
-                    response_times.append(response_time)
+    def count_response_times(self, emails: Iterable[Dict]):
+        """Hours between consecutive messages from different senders in each thread.
+
+        A list in exact mode, a QuantileSketch in sketch mode.
+        """
+        stats = EmailStats(self.stats_mode, self.stats_error, patterns=False)
+        stats.add_all(emails)
+        return stats.response_time_counts()
+
+    @staticmethod
+    def merge_response_counts(counts: List) -> List:
+        """Combine count_response_times results, e.g. from several accounts."""
+        merged = None
+        for response_times in counts:
+            if merged is None:
+                merged = response_times
+            elif isinstance(merged, QuantileSketch):
+                merged = merged.merge(response_times)
+            else:
+                merged = merged + response_times
+        return merged if merged is not None else []
+
+    @staticmethod
+    def summarize_response_times(response_times) -> Dict:
+        if isinstance(response_times, QuantileSketch):
+            if not response_times.count:
+                return {'average': 0, 'min': 0, 'max': 0, 'count': 0, 'median': 0, 'p90': 0}
+            return {
+                'average': response_times.sum / response_times.count,
+                'min': response_times.min,
+                'max': response_times.max,
+                'count': response_times.count,
+                'median': response_times.quantile(0.5),
+                'p90': response_times.quantile(0.9)
+            }
 
         if not response_times:
-            return {'average': 0, 'min': 0, 'max': 0}
+            return {'average': 0, 'min': 0, 'max': 0, 'count': 0, 'median': 0, 'p90': 0}
 
+        ordered = sorted(response_times)
         return {
-            'average': sum(response_times) / len(response_times),
-            'min': min(response_times),
-            'max': max(response_times)
+            'average': sum(ordered) / len(ordered),
+            'min': ordered[0],
+            'max': ordered[-1],
+            'count': len(ordered),
+            'median': ordered[int(0.5 * (len(ordered) - 1))],
+            'p90': ordered[int(0.9 * (len(ordered) - 1))]
         }
 
+    @profiler.timed('analyze_communication_patterns')
     def analyze_communication_patterns(self, emails: List[Dict]) -> Dict:
-        patterns = {
-            'peak_hours': {},
-            'frequent_contacts': {},
-            'daily_volume': {}
-        }
+        return self.summarize_patterns(self.count_communication_patterns(emails))
 
-        for email in emails:
-            try:
-                date = datetime.strptime(email['date'], '%a, %d %b %Y %H:%M:%S %z')
-            except ValueError:
-                try:
-                    date = datetime.strptime(email['date'], '%d %b %Y %H:%M:%S %z')
-                except ValueError:
-                    continue
+    def count_communication_patterns(self, emails: Iterable[Dict]) -> Dict:
+        """Per-hour, per-sender, per-day and distinct-senders-per-day counts, before any top-N cut.
 
-            hour = date.hour
-            patterns['peak_hours'][hour] = patterns['peak_hours'].get(hour, 0) + 1
-            sender = email['from']
-            patterns['frequent_contacts'][sender] = patterns['frequent_contacts'].get(sender, 0) + 1
-            day = date.strftime('%Y-%m-%d')
-            patterns['daily_volume'][day] = patterns['daily_volume'].get(day, 0) + 1
+        In sketch mode contacts go into a SpaceSaving sketch and daily senders into
+        HyperLogLog sketches, so memory does not grow with the number of senders.
+        """
+        stats = EmailStats(self.stats_mode, self.stats_error, response_times=False)
+        stats.add_all(emails)
+        return stats.pattern_counts
+
+    @staticmethod
+    def merge_pattern_counts(counts: List[Dict]) -> Dict:
+        """Combine several count_communication_patterns results."""
+        merged = {}
+        for patterns in counts:
+            for name, values in patterns.items():
+                if isinstance(values, SpaceSaving):
+                    merged[name] = merged[name].merge(values) if name in merged else values
+                    continue
+                target = merged.setdefault(name, {})
+                for key, value in values.items():
+                    if key not in target:
+                        target[key] = value
+                    elif isinstance(value, HyperLogLog):
+                        target[key] = target[key].merge(value)
+                    elif isinstance(value, set):
+                        target[key] = target[key] | value
+                    else:
+                        target[key] += value
+        return merged
 
-        patterns['peak_hours'] = dict(sorted(patterns['peak_hours'].items(), 
-                                            key=lambda x: x[1], reverse=True)[:5])
-        patterns['frequent_contacts'] = dict(sorted(patterns['frequent_contacts'].items(), 
-                                                  key=lambda x: x[1], reverse=True)[:10])
-        patterns['daily_volume'] = dict(sorted(patterns['daily_volume'].items()))
+    @staticmethod
+    def summarize_patterns(patterns: Dict) -> Dict:
+        contacts = patterns.get('frequent_contacts', {})
+        if isinstance(contacts, SpaceSaving):
+            top_contacts = contacts.top(10)
+        else:
+            top_contacts = dict(sorted(contacts.items(), key=lambda x: x[1], reverse=True)[:10])
+        return {
+            'peak_hours': dict(sorted(patterns.get('peak_hours', {}).items(),
+                                      key=lambda x: x[1], reverse=True)[:5]),
+            'frequent_contacts': top_contacts,
+            'daily_volume': dict(sorted(patterns.get('daily_volume', {}).items())),
+            'daily_senders': {day: senders.count() if isinstance(senders, HyperLogLog) else len(senders)
+                              for day, senders in sorted(patterns.get('daily_senders', {}).items())}
+        }
 
-        return patterns
+    @profiler.timed('generate_email_network')
+    def generate_email_network(self, emails: List[Dict]) -> 'go.Figure':
+        # Imported lazily so headless runs never load plotly
+        import networkx as nx
+        import plotly.graph_objects as go
 
-    def generate_email_network(self, emails: List[Dict]) -> go.Figure:
         G = nx.DiGraph()
         
         for email in emails:
@@ -193,4 +494,104 @@ class EmailAnalyzer:
                         hovermode='closest',
                         margin=dict(b=20,l=5,r=5,t=40)))
         
-        return fig
\ No newline at end of file
+        return fig
+
+class EmailStats:
+    """Single-pass accumulator for communication patterns and response times.
+
+    Emails can be added one at a time as they stream in, never kept
+    themselves. Exact mode keeps a (date, sender) pair per threaded message.
+    Sketch mode keeps memory flat: response times go straight into a
+    QuantileSketch, and only the oldest and newest message of at most
+    max_threads recently active threads are remembered.
+    """
+
+    def __init__(self, stats_mode: str = 'exact', stats_error: float = 0.01,
+                 patterns: bool = True, response_times: bool = True, max_threads: int = 10000):
+        self.stats_mode = stats_mode
+        self.stats_error = stats_error
+        self.sketch = stats_mode == 'sketch'
+        self.max_threads = max_threads
+        self.response_sketch = QuantileSketch(stats_error) if self.sketch and response_times else None
+        self.pattern_counts = {
+            'peak_hours': {},
+            'frequent_contacts': SpaceSaving.for_error(stats_error) if self.sketch else {},
+            'daily_volume': {},
+            'daily_senders': {}
+        } if patterns else None
+        if not response_times:
+            self.threads = None
+        else:
+            # In sketch mode, ordered by last activity so the stalest thread is evicted first
+            self.threads = OrderedDict() if self.sketch else {}
+
+    def add_all(self, emails: Iterable[Dict]):
+        for email in emails:
+            self.add(email)
+
+    def add(self, email: Dict):
+        date = parse_email_date(email['date'])
+        if date is None:
+            return
+        sender = email['from']
+        if self.response_sketch is not None:
+            self._add_to_thread_ends(thread_key(email), date, sender)
+        elif self.threads is not None:
+            self.threads.setdefault(thread_key(email), []).append((date, sender))
+        if self.pattern_counts is None:
+            return
+
+        patterns = self.pattern_counts
+        hour = date.hour
+        patterns['peak_hours'][hour] = patterns['peak_hours'].get(hour, 0) + 1
+        if self.sketch:
+            patterns['frequent_contacts'].add(sender)
+        else:
+            patterns['frequent_contacts'][sender] = patterns['frequent_contacts'].get(sender, 0) + 1
+        day = date.strftime('%Y-%m-%d')
+        patterns['daily_volume'][day] = patterns['daily_volume'].get(day, 0) + 1
+        if day not in patterns['daily_senders']:
+            patterns['daily_senders'][day] = HyperLogLog.for_error(self.stats_error) if self.sketch else set()
+        patterns['daily_senders'][day].add(sender)
+
+    def _add_to_thread_ends(self, key, date, sender):
+        """Pair a message with the end of its thread it extends and record the gap right away.
+
+        Fetches come newest first and delta syncs add newer mail, so messages
+        extend a thread at one of its ends; one landing in between is skipped.
+        """
+        ends = self.threads.get(key)
+        if ends is None:
+            if len(self.threads) >= self.max_threads:
+                # Drop the thread that has gone longest without a message
+                self.threads.popitem(last=False)
+            self.threads[key] = [date, sender, date, sender]
+            return
+        self.threads.move_to_end(key)
+        oldest_date, oldest_sender, newest_date, newest_sender = ends
+        if date <= oldest_date:
+            if sender != oldest_sender:
+                self.response_sketch.add((oldest_date - date).total_seconds() / 3600)
+            ends[0], ends[1] = date, sender
+        elif date >= newest_date:
+            if sender != newest_sender:
+                self.response_sketch.add((date - newest_date).total_seconds() / 3600)
+            ends[2], ends[3] = date, sender
+
+    def response_time_counts(self):
+        """A list of response times in hours in exact mode, a QuantileSketch in sketch mode."""
+        if self.response_sketch is not None:
+            return self.response_sketch
+        response_times = []
+        for thread in (self.threads or {}).values():
+            thread.sort(key=lambda x: x[0])
+            for (previous_date, previous_sender), (date, sender) in zip(thread, thread[1:]):
+                if sender != previous_sender:
+                    response_times.append((date - previous_date).total_seconds() / 3600)
+        return response_times
+
+    def response_times(self) -> Dict:
+        return EmailAnalyzer.summarize_response_times(self.response_time_counts())
+
+    def patterns(self) -> Dict:
+        return EmailAnalyzer.summarize_patterns(self.pattern_counts or {})
@@ -0,0 +1,20 @@
+from typing import Optional
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+DATE_FORMATS = ['%a, %d %b %Y %H:%M:%S %z', '%d %b %Y %H:%M:%S %z']
+
+def parse_email_date(value: str) -> Optional[datetime]:
+    """Parse a Date header. Returns None if it cannot be parsed."""
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    # Slower fallback for obsolete forms and trailing comments such as "(UTC)"
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    # "-0000" means no zone information; treat it as UTC so dates stay comparable
+    return date if date.tzinfo else date.replace(tzinfo=timezone.utc)
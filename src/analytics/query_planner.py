@@ -0,0 +1,83 @@
+"""Turn fetch filters into a server-side Gmail query.
+
+Everything Gmail can filter is pushed into the messages.list call, either
+as search operators in q or as labelIds, so unwanted messages are never
+listed or downloaded. Supported filters (all optional):
+
+    months_back        int, window ending today (ignored if 'after' is set)
+    after, before      date, datetime or 'YYYY-MM-DD'
+    exclude_categories e.g. ['promotions', 'social']
+    senders            addresses or names; messages from any of them
+    exclude_senders    addresses or names to leave out
+    labels             label names; messages must carry all of them
+    has_attachment     bool
+    unread             bool
+    query              extra raw Gmail search text
+"""
+from typing import List, Dict, Union
+from datetime import date, datetime, timedelta
+
+CATEGORIES = ['primary', 'personal', 'social', 'promotions', 'updates', 'forums']
+
+# System labels can go in labelIds; user label IDs are opaque, so those are matched by name in q
+SYSTEM_LABELS = {'INBOX', 'SENT', 'DRAFT', 'SPAM', 'TRASH', 'UNREAD', 'STARRED', 'IMPORTANT',
+                 'CATEGORY_PERSONAL', 'CATEGORY_SOCIAL', 'CATEGORY_PROMOTIONS', 'CATEGORY_UPDATES',
+                 'CATEGORY_FORUMS'}
+
+def parse_date(value: str) -> date:
+    """A 'YYYY-MM-DD' filter date; raises ValueError otherwise."""
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def _gmail_date(value: Union[date, datetime, str]) -> str:
+    if isinstance(value, str):
+        value = parse_date(value)
+    return value.strftime('%Y/%m/%d')
+
+def _quote(term: str) -> str:
+    """Quote a search term if it contains characters Gmail would treat as syntax."""
+    if any(c in term for c in ' ()"{}'):
+        return '"' + term.replace('"', '') + '"'
+    return term
+
+def _any_of(operator: str, values: List[str]) -> str:
+    terms = [_quote(value) for value in values]
+    return f'{operator}:{terms[0]}' if len(terms) == 1 else f'{operator}:({" OR ".join(terms)})'
+
+def plan_query(filters: Dict) -> Dict:
+    """Return the messages.list arguments for filters: {'q': str, 'labelIds': [...]}."""
+    terms = []
+    label_ids = []
+
+    after = filters.get('after')
+    if after is None and filters.get('months_back'):
+        after = datetime.now() - timedelta(days=30 * filters['months_back'])
+    if after is not None:
+        terms.append(f'after:{_gmail_date(after)}')
+    if filters.get('before') is not None:
+        terms.append(f'before:{_gmail_date(filters["before"])}')
+
+    for category in filters.get('exclude_categories', []):
+        if category.lower() not in CATEGORIES:
+            raise ValueError(f'Unknown Gmail category: {category}')
+        terms.append(f'-category:{category.lower()}')
+
+    if filters.get('senders'):
+        terms.append(_any_of('from', filters['senders']))
+    for sender in filters.get('exclude_senders', []):
+        terms.append(f'-from:{_quote(sender)}')
+
+    for label in filters.get('labels', []):
+        if label.upper() in SYSTEM_LABELS:
+            label_ids.append(label.upper())
+        else:
+            terms.append(f'label:{_quote(label)}')
+
+    if filters.get('has_attachment'):
+        terms.append('has:attachment')
+    if filters.get('unread') and 'UNREAD' not in label_ids:
+        label_ids.append('UNREAD')
+
+    if filters.get('query'):
+        terms.append(filters['query'])
+
+    return {'q': ' '.join(terms), 'labelIds': label_ids}
@@ -0,0 +1,145 @@
+"""Pre-aggregated message counts for date-range analytics.
+
+Every ingested message adds one to its (day, hour, sender, label) cell,
+once under the '*' label and once per Gmail label. Volume, heatmap,
+top-sender and week-over-week queries then read the small rollup table
+instead of re-fetching and re-scanning messages.
+"""
+from typing import List, Dict, Optional, Tuple
+from datetime import date, timedelta
+from email.utils import parseaddr
+from analytics.email_dates import parse_email_date
+import sqlite3
+
+ALL_LABELS = '*'
+
+class RollupStore:
+    def __init__(self, db_file: str = 'rollup.db'):
+        self.db_file = db_file
+        self.conn = sqlite3.connect(self.db_file)
+        self._create_tables()
+
+    def _create_tables(self):
+        with self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS senders (
+                    sender_id INTEGER PRIMARY KEY,
+                    address TEXT UNIQUE NOT NULL,
+                    display TEXT NOT NULL
+                )''')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS rollup (
+                    day TEXT NOT NULL,
+                    hour INTEGER NOT NULL,
+                    weekday INTEGER NOT NULL,
+                    sender_id INTEGER NOT NULL,
+                    label TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (label, day, hour, sender_id)
+                ) WITHOUT ROWID''')
+            # Only message IDs are kept, so re-ingesting a sync window is a no-op
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS ingested (
+                    message_id TEXT PRIMARY KEY
+                ) WITHOUT ROWID''')
+
+    def close(self):
+        self.conn.close()
+
+    def _sender_id(self, sender: str) -> int:
+        address = parseaddr(sender)[1].lower() or sender
+        row = self.conn.execute('SELECT sender_id FROM senders WHERE address = ?', (address,)).fetchone()
+        if row:
+            return row[0]
+        return self.conn.execute('INSERT INTO senders (address, display) VALUES (?, ?)',
+                                 (address, sender)).lastrowid
+
+    def add_emails(self, emails: List[Dict]) -> int:
+        """Count emails that have not been ingested yet. Returns the number of new emails."""
+        cells = {}
+        sender_ids = {}
+        added = 0
+        with self.conn:
+            for email in emails:
+                sent = parse_email_date(email.get('date', ''))
+                if sent is None:
+                    continue
+                cursor = self.conn.execute('INSERT OR IGNORE INTO ingested (message_id) VALUES (?)', (email['id'],))
+                if not cursor.rowcount:
+                    continue
+                added += 1
+
+                sender = email.get('from', '')
+                if sender not in sender_ids:
+                    sender_ids[sender] = self._sender_id(sender)
+                day = sent.strftime('%Y-%m-%d')
+                for label in [ALL_LABELS] + email.get('labels', []):
+                    key = (label, day, sent.hour, sender_ids[sender], sent.weekday())
+                    cells[key] = cells.get(key, 0) + 1
+
+            self.conn.executemany('''
+                INSERT INTO rollup (label, day, hour, sender_id, weekday, count) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (label, day, hour, sender_id) DO UPDATE SET count = count + excluded.count''',
+                [key + (count,) for key, count in cells.items()])
+        return added
+
+    def _range(self, start: Optional[str], end: Optional[str], label: str) -> Tuple[str, list]:
+        """WHERE clause for an inclusive day range; None leaves that side open."""
+        return ('label = ? AND day >= ? AND day <= ?',
+                [label, start or '0000-00-00', end or '9999-99-99'])
+
+    def volume(self, start: Optional[str] = None, end: Optional[str] = None,
+               label: str = ALL_LABELS) -> Dict[str, int]:
+        """Messages per day, keyed 'YYYY-MM-DD'."""
+        where, params = self._range(start, end, label)
+        return dict(self.conn.execute(
+            f'SELECT day, SUM(count) FROM rollup WHERE {where} GROUP BY day ORDER BY day', params))
+
+    def heatmap(self, start: Optional[str] = None, end: Optional[str] = None,
+                label: str = ALL_LABELS) -> List[List[int]]:
+        """7x24 message counts, rows Monday..Sunday and columns by hour."""
+        where, params = self._range(start, end, label)
+        grid = [[0] * 24 for _ in range(7)]
+        for weekday, hour, count in self.conn.execute(
+                f'SELECT weekday, hour, SUM(count) FROM rollup WHERE {where} GROUP BY weekday, hour', params):
+            grid[weekday][hour] = count
+        return grid
+
+    def peak_hours(self, start: Optional[str] = None, end: Optional[str] = None,
+                   label: str = ALL_LABELS, limit: int = 5) -> Dict[int, int]:
+        where, params = self._range(start, end, label)
+        return dict(self.conn.execute(
+            f'SELECT hour, SUM(count) AS n FROM rollup WHERE {where} GROUP BY hour ORDER BY n DESC LIMIT ?',
+            params + [limit]))
+
+    def top_senders(self, start: Optional[str] = None, end: Optional[str] = None,
+                    label: str = ALL_LABELS, limit: int = 10) -> Dict[str, int]:
+        where, params = self._range(start, end, label)
+        return dict(self.conn.execute(f'''
+            SELECT senders.display, totals.n FROM (
+                SELECT sender_id, SUM(count) AS n FROM rollup WHERE {where}
+                GROUP BY sender_id ORDER BY n DESC LIMIT ?
+            ) AS totals JOIN senders USING (sender_id) ORDER BY totals.n DESC''', params + [limit]))
+
+    def patterns(self, start: Optional[str] = None, end: Optional[str] = None,
+                 label: str = ALL_LABELS) -> Dict:
+        """Same shape as EmailAnalyzer.analyze_communication_patterns, for any date range."""
+        return {
+            'peak_hours': self.peak_hours(start, end, label),
+            'frequent_contacts': self.top_senders(start, end, label),
+            'daily_volume': self.volume(start, end, label)
+        }
+
+    def week_over_week(self, end: Optional[date] = None, label: str = ALL_LABELS) -> Dict:
+        """Messages in the 7 days ending on end (default: today) against the 7 days before."""
+        end = end or date.today()
+        this_start = end - timedelta(days=6)
+        last_end = this_start - timedelta(days=1)
+        last_start = last_end - timedelta(days=6)
+
+        this_week = sum(self.volume(this_start.isoformat(), end.isoformat(), label).values())
+        last_week = sum(self.volume(last_start.isoformat(), last_end.isoformat(), label).values())
+        result = {'this_week': this_week, 'last_week': last_week}
+        if last_week:
+            result['change'] = (this_week - last_week) / last_week
+        return result
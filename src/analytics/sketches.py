@@ -0,0 +1,173 @@
+"""Bounded-memory, mergeable summaries for sketch-mode statistics.
+
+- SpaceSaving: heavy hitters (top contacts); each count is overestimated
+  by at most total / capacity.
+- HyperLogLog: distinct counts (senders per day); relative standard error
+  about 1.04 / sqrt(2 ** precision).
+- QuantileSketch: DDSketch-style quantiles (response times); every
+  quantile is within relative_accuracy of the exact value as long as the
+  values span at most max_buckets buckets, after which the lowest quantiles
+  lose accuracy first.
+
+All three merge, so per-account results combine without raw data, and all
+pickle, so they cross process boundaries.
+"""
+from typing import Dict, Hashable, Optional
+import hashlib
+import math
+
+class SpaceSaving:
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.total = 0
+
+    @classmethod
+    def for_error(cls, epsilon: float) -> 'SpaceSaving':
+        """Sketch whose counts are off by at most epsilon * total."""
+        return cls(math.ceil(1 / epsilon))
+
+    def add(self, item: Hashable, count: int = 1):
+        self.total += count
+        if item in self.counts:
+            self.counts[item] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = count
+            self.errors[item] = 0
+        else:
+            # Replace the smallest counter; the newcomer inherits its count as error
+            smallest = min(self.counts, key=self.counts.get)
+            floor = self.counts.pop(smallest)
+            del self.errors[smallest]
+            self.counts[item] = floor + count
+            self.errors[item] = floor
+
+    def top(self, n: int) -> Dict[Hashable, int]:
+        return dict(sorted(self.counts.items(), key=lambda x: x[1], reverse=True)[:n])
+
+    def _floor(self) -> int:
+        """Upper bound on the count of any item this sketch does not track."""
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def merge(self, other: 'SpaceSaving') -> 'SpaceSaving':
+        merged = SpaceSaving(max(self.capacity, other.capacity))
+        merged.total = self.total + other.total
+        # An item missing from a full sketch may still have occurred up to its floor
+        # times there, so it gets that floor, keeping counts overestimates
+        counts = {}
+        errors = {}
+        for sketch, rest in ((self, other), (other, self)):
+            floor = rest._floor()
+            for item, count in sketch.counts.items():
+                if item in counts:
+                    continue
+                if item in rest.counts:
+                    counts[item] = count + rest.counts[item]
+                    errors[item] = sketch.errors[item] + rest.errors[item]
+                else:
+                    counts[item] = count + floor
+                    errors[item] = sketch.errors[item] + floor
+        for item in sorted(counts, key=counts.get, reverse=True)[:merged.capacity]:
+            merged.counts[item] = counts[item]
+            merged.errors[item] = errors[item]
+        return merged
+
+class HyperLogLog:
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    @classmethod
+    def for_error(cls, epsilon: float) -> 'HyperLogLog':
+        """Sketch with a relative standard error of about epsilon."""
+        return cls(min(16, max(4, math.ceil(2 * math.log2(1.04 / epsilon)))))
+
+    def add(self, item: str):
+        # A stable hash, unlike hash(), so sketches from different processes merge
+        value = int.from_bytes(hashlib.blake2b(item.encode('utf-8'), digest_size=8).digest(), 'big')
+        index = value >> (64 - self.precision)
+        rest = value & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        if other.precision != self.precision:
+            raise ValueError('Cannot merge HyperLogLog sketches of different precision')
+        merged = HyperLogLog(self.precision)
+        merged.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+        return merged
+
+class QuantileSketch:
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        """Add a non-negative value."""
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value <= 0:
+            self.zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self.log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self):
+        # Fold the lowest buckets together; high quantiles keep their accuracy
+        keys = sorted(self.buckets)
+        excess = len(keys) - self.max_buckets
+        folded = sum(self.buckets.pop(key) for key in keys[:excess + 1])
+        self.buckets[keys[excess]] = folded
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                # Midpoint of the bucket (gamma^(key-1), gamma^key], clamped to the observed range
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        merged = QuantileSketch(self.relative_accuracy, max(self.max_buckets, other.max_buckets))
+        for sketch in (self, other):
+            for key, count in sketch.buckets.items():
+                merged.buckets[key] = merged.buckets.get(key, 0) + count
+            merged.zero_count += sketch.zero_count
+            merged.count += sketch.count
+            merged.sum += sketch.sum
+            merged.min = min(merged.min, sketch.min)
+            merged.max = max(merged.max, sketch.max)
+        while len(merged.buckets) > merged.max_buckets:
+            merged._collapse()
+        return merged
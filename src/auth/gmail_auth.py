@@ -2,48 +2,104 @@ import os
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
+from google.auth.credentials import AnonymousCredentials
 from googleapiclient.discovery import build
+from metrics.profiler import profiler
 import pickle
+import re
 
 class GmailAuth:
     SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
     BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     TOKEN_FILE = os.path.join(BASE_DIR, 'token.pickle')
     CREDENTIALS_FILE = os.path.join(BASE_DIR, 'credentials.json')
+    TOKENS_DIR = os.path.join(BASE_DIR, 'tokens')
 
-    def __init__(self):
+    def __init__(self, account=None, api_endpoint=None):
         self.creds = None
         self.service = None
+        # One token per account; without an account the original token.pickle is used
+        self.account = account
+        self.token_file = self.token_file_for(account) if account else self.TOKEN_FILE
+        # Point the API client at another server, e.g. benchmarks/fake_gmail_server.py
+        self.api_endpoint = api_endpoint or os.environ.get('GMAIL_API_ENDPOINT')
 
-    def authenticate(self):
-        if os.path.exists(self.TOKEN_FILE):
-            with open(self.TOKEN_FILE, 'rb') as token:
+    @staticmethod
+    def safe_name(account: str) -> str:
+        """Account name usable in file names."""
+        return re.sub(r'[^\w.@-]', '_', account)
+
+    @classmethod
+    def token_file_for(cls, account: str) -> str:
+        return os.path.join(cls.TOKENS_DIR, f'token_{cls.safe_name(account)}.pickle')
+
+    @profiler.timed('authenticate')
+    def authenticate(self, interactive: bool = True):
+        """Load or refresh credentials and build the service.
+
+        Without interactive, never opens the browser OAuth flow.
+        """
+        if not self.load_credentials(interactive):
+            return False
+        self.service = self.build_service()
+        return True
+
+    def load_credentials(self, interactive: bool = True) -> bool:
+        if self.api_endpoint:
+            # Local stand-in servers need no OAuth
+            self.creds = AnonymousCredentials()
+            return True
+
+        if os.path.exists(self.token_file):
+            with open(self.token_file, 'rb') as token:
                 self.creds = pickle.load(token)
 
         if not self.creds or not self.creds.valid:
             if self.creds and self.creds.expired and self.creds.refresh_token:
                 self.creds.refresh(Request())
             else:
+                if not interactive:
+                    print(f'No valid token at {self.token_file}; run the app interactively once to sign in')
+                    return False
                 if not os.path.exists(self.CREDENTIALS_FILE):
                     print(f'Credentials file not found at: {self.CREDENTIALS_FILE}')
                     return False
                 flow = InstalledAppFlow.from_client_secrets_file(
                     self.CREDENTIALS_FILE, self.SCOPES)
-                self.creds = flow.run_local_server(port=0)
-
-            with open(self.TOKEN_FILE, 'wb') as token:
-                pickle.dump(self.creds, token)
+                if self.account:
+                    self.creds = flow.run_local_server(port=0, login_hint=self.account)
+                else:
+                    self.creds = flow.run_local_server(port=0)
 
-        self.service = build('gmail', 'v1', credentials=self.creds)
+            self.save_credentials()
         return True
 
+    def save_credentials(self):
+        os.makedirs(os.path.dirname(self.token_file), exist_ok=True)
+        with open(self.token_file, 'wb') as token:
+            pickle.dump(self.creds, token)
+
+    def build_service(self, http=None, request_builder=None):
+        """Build the Gmail service from the discovery document bundled with the client library.
+
+        With http, requests go through that (authorized) transport instead of the credentials.
+        """
+        kwargs = {'static_discovery': True, 'cache_discovery': False}
+        if self.api_endpoint:
+            kwargs['client_options'] = {'api_endpoint': self.api_endpoint}
+        if request_builder:
+            kwargs['requestBuilder'] = request_builder
+        if http is not None:
+            return build('gmail', 'v1', http=http, **kwargs)
+        return build('gmail', 'v1', credentials=self.creds, **kwargs)
+
     def get_service(self):
         return self.service
 
     def logout(self):
         """Clear credentials and remove token file"""
-        if os.path.exists(self.TOKEN_FILE):
-            os.remove(self.TOKEN_FILE)
+        if os.path.exists(self.token_file):
+            os.remove(self.token_file)
         self.creds = None
         self.service = None
         return True
\ No newline at end of file
@@ -0,0 +1,87 @@
+"""Process-wide authenticated Gmail sessions.
+
+Authentication and service discovery happen once per account and process.
+Credentials are refreshed in the background ahead of expiry, and each
+thread reuses its own keep-alive HTTP connection.
+"""
+from typing import Optional
+from datetime import datetime, timedelta
+from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.http import HttpRequest
+from auth.gmail_auth import GmailAuth
+from metrics.profiler import profiler
+import httplib2
+import threading
+
+class GmailSession:
+    REFRESH_MARGIN = timedelta(minutes=5)
+    HTTP_TIMEOUT = 60
+
+    def __init__(self, auth: GmailAuth):
+        self.auth = auth
+        self._local = threading.local()
+        self._refresh_lock = threading.Lock()
+        self._refresh_timer = None
+        self.service = auth.build_service(http=self._thread_http(), request_builder=self._build_request)
+        auth.service = self.service
+        self._schedule_refresh()
+
+    def _thread_http(self) -> AuthorizedHttp:
+        # httplib2 is not thread-safe, so each thread keeps its own pooled connection
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = AuthorizedHttp(self.auth.creds, http=httplib2.Http(timeout=self.HTTP_TIMEOUT))
+            self._local.http = http
+        return http
+
+    def _build_request(self, http, *args, **kwargs) -> HttpRequest:
+        return HttpRequest(self._thread_http(), *args, **kwargs)
+
+    def _schedule_refresh(self):
+        expiry = getattr(self.auth.creds, 'expiry', None)
+        if not expiry or not getattr(self.auth.creds, 'refresh_token', None):
+            return
+        # google-auth expiry is a naive UTC datetime
+        delay = (expiry - self.REFRESH_MARGIN - datetime.utcnow()).total_seconds()
+        self._refresh_timer = threading.Timer(max(delay, 0), self.refresh)
+        self._refresh_timer.daemon = True
+        self._refresh_timer.start()
+
+    def refresh(self):
+        """Refresh credentials now and schedule the next refresh."""
+        with self._refresh_lock:
+            try:
+                self.auth.creds.refresh(Request())
+                self.auth.save_credentials()
+            except Exception as e:
+                # AuthorizedHttp still refreshes on a 401, so a failed early refresh is not fatal
+                print(f'Background token refresh failed: {e}')
+                return
+        self._schedule_refresh()
+
+    def close(self):
+        if self._refresh_timer:
+            self._refresh_timer.cancel()
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def get_session(account: Optional[str] = None, interactive: bool = True) -> Optional[GmailSession]:
+    """Return the process-wide session for account, authenticating on first use."""
+    with _sessions_lock:
+        session = _sessions.get(account)
+        if session is None:
+            with profiler.span('authenticate', account=account or ''):
+                auth = GmailAuth(account)
+                if not auth.load_credentials(interactive):
+                    return None
+                session = GmailSession(auth)
+            _sessions[account] = session
+        return session
+
+def close_session(account: Optional[str] = None):
+    with _sessions_lock:
+        session = _sessions.pop(account, None)
+    if session:
+        session.close()
@@ -0,0 +1,194 @@
+"""Headless batch mode: auth, fetch, extract, prioritize and analyze without Qt.
+
+Nothing in this module may import PyQt6 or plotly, so it runs on servers
+without a display and avoids the GUI's startup and memory cost.
+"""
+from typing import List, Dict, Iterable, Optional
+from analytics.email_analyzer import EmailAnalyzer
+from tasks.task_extractor import TaskExtractor
+from tasks.task_store import TaskStore
+from tasks.prefilter import BulkMailFilter
+from tasks.dedup import TaskDeduplicator
+from analytics.rollup import RollupStore
+from analytics.query_planner import CATEGORIES, parse_date
+from tasks.task_export import TaskExporter, iter_chunks
+from pipeline.ingest import ingest_emails
+import argparse
+import os
+
+# Exit codes for cron and other schedulers
+EXIT_OK = 0
+EXIT_AUTH_FAILED = 2
+EXIT_FETCH_FAILED = 3
+EXIT_OUTPUT_FAILED = 4
+EXIT_PARTIAL_FAILURE = 5  # Multi-account run where some accounts failed
+
+ANALYTICS_SCHEMA = [
+    ('metric', 'string'),
+    ('key', 'string'),
+    ('value', 'double'),
+]
+
+def _date_arg(value: str):
+    try:
+        return parse_date(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid date {value!r}, expected YYYY-MM-DD')
+
+def add_arguments(arg_parser):
+    group = arg_parser.add_argument_group('headless mode')
+    group.add_argument('--headless', action='store_true',
+                       help='run the pipeline without the GUI and write results to --output')
+    group.add_argument('--months-back', type=int, default=2, help='fetch window in months (default: 2)')
+    group.add_argument('--query', default='', help='extra Gmail search query, e.g. "-category:promotions"')
+    group.add_argument('--after', type=_date_arg, metavar='YYYY-MM-DD',
+                       help='only mail on or after YYYY-MM-DD (overrides --months-back)')
+    group.add_argument('--before', type=_date_arg, metavar='YYYY-MM-DD', help='only mail before YYYY-MM-DD')
+    group.add_argument('--exclude-category', action='append', default=[], choices=CATEGORIES,
+                       help='skip a Gmail category server-side; repeatable')
+    group.add_argument('--from', dest='senders', action='append', default=[],
+                       help='only mail from this sender; repeatable')
+    group.add_argument('--label', action='append', default=[], help='only mail with this label; repeatable')
+    group.add_argument('--has-attachment', action='store_true', help='only mail with attachments')
+    group.add_argument('--unread', action='store_true', help='only unread mail')
+    group.add_argument('--estimate', action='store_true',
+                       help='print how many messages the filters match and exit without fetching')
+    group.add_argument('--output', default='output', help='directory for tasks and analytics files')
+    group.add_argument('--format', choices=['jsonl', 'parquet'], default='jsonl')
+    group.add_argument('--compress', action='store_true', help='gzip JSON Lines, zstd Parquet')
+    group.add_argument('--scan-body', action='store_true',
+                       help='look for tasks in the message body (HTML-aware, bounded) instead of the snippet')
+    group.add_argument('--no-prefilter', action='store_true',
+                       help='run full extraction on newsletters and automated mail too')
+    group.add_argument('--no-dedup', action='store_true', help='keep near-duplicate tasks as separate rows')
+    group.add_argument('--task-db', default='tasks.db',
+                       help='task store used for incremental extraction; one per account with --accounts')
+    group.add_argument('--max-reextract', type=int, default=2000, metavar='N',
+                       help='after an extractor upgrade, re-extract at most N stored messages per run; '
+                            'the rest follow in later runs (default: 2000)')
+    group.add_argument('--stats', choices=['exact', 'sketch'], default='exact',
+                       help='sketch bounds memory for contact and response-time statistics (about 1%% error)')
+    group.add_argument('--rollup-db', default='rollup.db',
+                       help='pre-aggregated counts for date-range analytics; one per account with --accounts')
+    group.add_argument('--accounts', default='',
+                       help='comma-separated accounts to process in parallel (sign in first with --login)')
+    group.add_argument('--max-messages', type=int, default=None, help='per-account message quota')
+    group.add_argument('--workers', type=int, default=None, help='processes for --accounts (default: one each)')
+
+def build_filters(args) -> Optional[Dict]:
+    """query_planner filters from the command line, or None if none were given."""
+    filters = {
+        'after': args.after,
+        'before': args.before,
+        'exclude_categories': args.exclude_category,
+        'senders': args.senders,
+        'labels': args.label,
+        'has_attachment': args.has_attachment,
+        'unread': args.unread
+    }
+    filters = {key: value for key, value in filters.items() if value}
+    return filters or None
+
+def analytics_rows(response_times: Dict, patterns: Dict) -> Iterable[Dict]:
+    """Flatten analytics results into (metric, key, value) rows."""
+    for key, value in response_times.items():
+        yield {'metric': 'response_time_hours', 'key': key, 'value': value}
+    for metric, values in patterns.items():
+        for key, value in values.items():
+            yield {'metric': metric, 'key': key, 'value': value}
+
+def _output_file(args, name: str) -> str:
+    extension = args.format + ('.gz' if args.compress and args.format == 'jsonl' else '')
+    return os.path.join(args.output, f'{name}.{extension}')
+
+def write_results(args, tasks: List[Dict], response_times: Dict, patterns: Dict):
+    os.makedirs(args.output, exist_ok=True)
+    TaskExporter(_output_file(args, 'tasks'), fmt=args.format, compress=args.compress).export(
+        iter_chunks(tasks))
+    TaskExporter(_output_file(args, 'analytics'), fmt=args.format, compress=args.compress,
+                 schema=ANALYTICS_SCHEMA).export([list(analytics_rows(response_times, patterns))])
+
+def run_accounts_headless(args, accounts: List[str]) -> int:
+    # Imported here so single-account runs do not pay for the process pool machinery
+    from accounts.account_runner import run_accounts
+
+    merged = run_accounts(accounts, months_back=args.months_back, query=args.query,
+                          max_messages=args.max_messages, max_workers=args.workers,
+                          scan_body=args.scan_body, prefilter=not args.no_prefilter,
+                          stats_mode=args.stats, dedup=not args.no_dedup, filters=build_filters(args),
+                          max_reextract=args.max_reextract, task_db=args.task_db,
+                          rollup_db=args.rollup_db)
+    for account, error in merged['errors'].items():
+        print(f'Account {account} failed: {error}')
+    if len(merged['errors']) == len(accounts):
+        return EXIT_FETCH_FAILED
+
+    try:
+        write_results(args, merged['tasks'], merged['response_times'], merged['patterns'])
+    except (OSError, RuntimeError) as e:
+        print(f'Error writing results: {e}')
+        return EXIT_OUTPUT_FAILED
+
+    print(f'Processed {merged["emails"]} emails from {len(accounts) - len(merged["errors"])} accounts, '
+          f'wrote {len(merged["tasks"])} tasks to {args.output}')
+    return EXIT_PARTIAL_FAILURE if merged['errors'] else EXIT_OK
+
+def estimate_headless(args, accounts: List[Optional[str]], filters: Optional[Dict]) -> int:
+    """Print Gmail's estimate of how many messages each account would fetch."""
+    print(f'Query: {EmailAnalyzer.plan(args.months_back, args.query, filters)}')
+    for account in accounts:
+        email_analyzer = EmailAnalyzer(account=account)
+        if not email_analyzer.connect(interactive=False):
+            print(f'Failed to connect to Gmail{f" for {account}" if account else ""}')
+            return EXIT_AUTH_FAILED
+        estimate = email_analyzer.estimate_count(args.months_back, args.query, filters)
+        if estimate is None:
+            return EXIT_FETCH_FAILED
+        print(f'{account or "default account"}: about {estimate} messages')
+    return EXIT_OK
+
+def run_headless(args) -> int:
+    accounts = [a.strip() for a in args.accounts.split(',') if a.strip()]
+    filters = build_filters(args)
+    if args.estimate:
+        return estimate_headless(args, accounts or [None], filters)
+    if accounts:
+        return run_accounts_headless(args, accounts)
+
+    email_analyzer = EmailAnalyzer(stats_mode=args.stats)
+    task_extractor = TaskExtractor(scan_body=args.scan_body,
+                                   bulk_filter=None if args.no_prefilter else BulkMailFilter(),
+                                   deduplicator=None if args.no_dedup else TaskDeduplicator())
+
+    if not email_analyzer.connect(interactive=False):
+        print('Failed to connect to Gmail')
+        return EXIT_AUTH_FAILED
+
+    emails = email_analyzer.iter_emails(months_back=args.months_back, force_refresh=True,
+                                        query=args.query, max_messages=args.max_messages,
+                                        filters=filters)
+    stats = email_analyzer.new_stats()
+    task_store = TaskStore(args.task_db)
+    rollup = RollupStore(args.rollup_db)
+    try:
+        message_ids = ingest_emails(emails, task_extractor, task_store, stats, sinks=[rollup.add_emails],
+                                    max_reextract=args.max_reextract)
+        if email_analyzer.last_error:
+            return EXIT_FETCH_FAILED
+        tasks = task_extractor.load_stored_tasks(message_ids, task_store)
+        patterns = stats.patterns()
+        patterns['week_over_week'] = rollup.week_over_week()
+    finally:
+        task_store.close()
+        rollup.close()
+    prioritized_tasks = task_extractor.prioritize_tasks(tasks)
+    response_times = stats.response_times()
+
+    try:
+        write_results(args, prioritized_tasks, response_times, patterns)
+    except (OSError, RuntimeError) as e:
+        print(f'Error writing results: {e}')
+        return EXIT_OUTPUT_FAILED
+
+    print(f'Processed {len(message_ids)} emails, wrote {len(prioritized_tasks)} tasks to {args.output}')
+    return EXIT_OK
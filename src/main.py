@@ -1,48 +1,76 @@
-from analytics.email_analyzer import EmailAnalyzer
-from tasks.task_extractor import TaskExtractor
-from PyQt6.QtWidgets import QApplication
-from ui.main_window import MainWindow
+from auth.gmail_auth import GmailAuth
+from tasks.task_store import TaskStore
+from snapshot.dashboard_snapshot import load_snapshot
+from search.search_index import SearchIndex
+from metrics.profiler import profiler
+from headless import add_arguments, run_headless, build_filters
+from functools import partial
+import argparse
+import atexit
 import sys
 import os
 
+SNAPSHOT_FILE = 'dashboard_snapshot.arrow'
+
+def parse_args(argv):
+    arg_parser = argparse.ArgumentParser(description='Email Analytics Dashboard')
+    arg_parser.add_argument('--profile', nargs='?', const='profile_trace.json', default=None, metavar='PATH',
+                            help='record timings and metrics; writes a JSON trace, or Prometheus text '
+                                 'if PATH ends in .prom (default: profile_trace.json)')
+    arg_parser.add_argument('--login', metavar='ACCOUNT', default=None,
+                            help='sign in to ACCOUNT and store its token for --accounts, then exit')
+    arg_parser.add_argument('--refresh-interval', type=float, default=5, metavar='MINUTES',
+                            help='minutes between background syncs in the dashboard, 0 for manual only (default: 5)')
+    add_arguments(arg_parser)
+    # Leave unknown arguments for Qt
+    return arg_parser.parse_known_args(argv)
+
 def main():
+    args, qt_argv = parse_args(sys.argv[1:])
+    if args.profile:
+        profiler.enable()
+        atexit.register(profiler.write, args.profile)
+
+    if args.login:
+        sys.exit(0 if GmailAuth(args.login).authenticate() else 1)
+    if args.headless:
+        sys.exit(run_headless(args))
+    run_gui(args, qt_argv)
+
+def run_gui(args, qt_argv):
+    # Qt is only imported here so headless runs never load it
+    from PyQt6.QtWidgets import QApplication
+    from ui.main_window import MainWindow
+    from ui.sync_worker import SyncWorker
+    from ui.sync_scheduler import SyncScheduler
+
     # Set Qt WebEngine paths before creating QApplication
     os.environ['QTWEBENGINE_DICTIONARIES_PATH'] = os.path.join(os.path.dirname(sys.executable), 'qtwebengine_dictionaries')
     os.environ['QTWEBENGINE_CHROMIUM_FLAGS'] = '--disable-gpu'
 
     # Create Qt Application
-    app = QApplication(sys.argv)
-    
-    # Initialize the analyzers
-    email_analyzer = EmailAnalyzer()
-    task_extractor = TaskExtractor()
-
-    # Connect to Gmail
-    if not email_analyzer.connect():
-        print("Failed to connect to Gmail")
-        return
-
-    # Fetch emails from the last 2 months with force refresh
-    emails = email_analyzer.fetch_emails(months_back=2, force_refresh=True)
-    if not emails:
-        print("No emails found or error occurred")
-        return
-
-    # Extract and prioritize tasks
-    tasks = task_extractor.extract_tasks(emails)
-    prioritized_tasks = task_extractor.prioritize_tasks(tasks)
-    
-    # Create and show main window
-    window = MainWindow()
-    window.display_tasks(prioritized_tasks)
-
-    # Analyze email patterns and response times
-    response_times = email_analyzer.analyze_response_times(emails)
-    patterns = email_analyzer.analyze_communication_patterns(emails)
-    window.display_analytics(response_times, patterns)
+    app = QApplication(sys.argv[:1] + qt_argv)
     
+    task_store = TaskStore()
+    search_index = SearchIndex()
+    window = MainWindow(task_store=task_store, search_index=search_index)
+
+    # Render the last snapshot right away, then sync in the background and swap in fresh data
+    with profiler.span('load_snapshot'):
+        snapshot = load_snapshot(SNAPSHOT_FILE)
+    if snapshot:
+        window.display_snapshot(snapshot)
     window.show()
 
+    make_worker = partial(SyncWorker, task_store.db_file, search_index.db_file, SNAPSHOT_FILE,
+                          months_back=args.months_back, query=args.query, scan_body=args.scan_body,
+                          prefilter=not args.no_prefilter, stats_mode=args.stats,
+                          dedup=not args.no_dedup, filters=build_filters(args),
+                          max_reextract=args.max_reextract)
+    sync_scheduler = SyncScheduler(make_worker, interval=args.refresh_interval * 60, parent=window)
+    app.aboutToQuit.connect(sync_scheduler.stop)
+    window.start_sync(sync_scheduler)
+
     # Start Qt event loop
     sys.exit(app.exec())
 
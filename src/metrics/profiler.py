@@ -0,0 +1,186 @@
+from typing import Dict, Optional
+from datetime import datetime
+from functools import wraps
+import json
+import os
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    def __init__(self, profiler, name: str, args: Dict):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._record_span(self.name, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+class Profiler:
+    """Timing spans, counters and peak memory, collected only while enabled.
+
+    When disabled, span() returns a shared no-op context manager and the
+    timed() wrapper costs a single attribute check, so instrumentation can
+    stay in hot paths.
+    """
+
+    PREFIX = 'email_analytics'
+
+    def __init__(self, max_events: int = 100000):
+        self.enabled = False
+        self.max_events = max_events
+        self.events = []
+        self.dropped_events = 0
+        self.span_stats = {}  # name -> [count, total_ns, max_ns]
+        self.counters = {}  # (name, labels) -> value
+        self.started = time.perf_counter_ns()
+        self.lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+        self.started = time.perf_counter_ns()
+
+    def span(self, name: str, **args):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, args)
+
+    def timed(self, name: str):
+        """Decorator recording a span around every call while profiling is enabled."""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Span(self, name, {}):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def cache_lookup(self, cache: str, hit: bool, value: int = 1):
+        self.count('cache_hits' if hit else 'cache_misses', value, cache=cache)
+
+    def _record_span(self, name: str, start: int, end: int, args: Dict):
+        duration = end - start
+        with self.lock:
+            stats = self.span_stats.setdefault(name, [0, 0, 0])
+            stats[0] += 1
+            stats[1] += duration
+            stats[2] = max(stats[2], duration)
+            if len(self.events) < self.max_events:
+                self.events.append({
+                    'name': name, 'ph': 'X', 'pid': os.getpid(), 'tid': threading.get_ident(),
+                    'ts': (start - self.started) / 1000, 'dur': duration / 1000, 'args': args
+                })
+            else:
+                self.dropped_events += 1
+
+    @staticmethod
+    def peak_memory_bytes() -> Optional[int]:
+        if resource is None:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+    def summary(self) -> Dict:
+        counters = {}
+        for (name, labels), value in self.counters.items():
+            label_text = ','.join(f'{k}={v}' for k, v in labels)
+            counters[f'{name}{{{label_text}}}' if labels else name] = value
+
+        cache_hit_rates = {}
+        for (name, labels), hits in self.counters.items():
+            if name != 'cache_hits':
+                continue
+            misses = self.counters.get(('cache_misses', labels), 0)
+            cache_hit_rates[dict(labels).get('cache', '')] = hits / (hits + misses) if hits + misses else 0.0
+
+        return {
+            'spans': {name: {'count': count, 'total_seconds': total / 1e9, 'max_seconds': longest / 1e9}
+                      for name, (count, total, longest) in self.span_stats.items()},
+            'counters': counters,
+            'cache_hit_rates': cache_hit_rates,
+            'peak_memory_bytes': self.peak_memory_bytes(),
+            'dropped_events': self.dropped_events
+        }
+
+    def write_trace(self, path: str):
+        """Chrome trace-event JSON (chrome://tracing, Perfetto) plus a summary."""
+        with open(path, 'w') as f:
+            json.dump({
+                'traceEvents': self.events,
+                'displayTimeUnit': 'ms',
+                'metadata': {'created': datetime.now().isoformat()},
+                'summary': self.summary()
+            }, f)
+
+    def write_prometheus(self, path: str):
+        """Prometheus text exposition format, e.g. for the node_exporter textfile collector."""
+        lines = [
+            f'# TYPE {self.PREFIX}_span_seconds summary',
+        ]
+        for name, (count, total, _) in sorted(self.span_stats.items()):
+            lines.append(f'{self.PREFIX}_span_seconds_count{{span="{name}"}} {count}')
+            lines.append(f'{self.PREFIX}_span_seconds_sum{{span="{name}"}} {total / 1e9:.9f}')
+        lines.append(f'# TYPE {self.PREFIX}_span_max_seconds gauge')
+        for name, (_, _, longest) in sorted(self.span_stats.items()):
+            lines.append(f'{self.PREFIX}_span_max_seconds{{span="{name}"}} {longest / 1e9:.9f}')
+
+        names = sorted({name for name, _ in self.counters})
+        for name in names:
+            lines.append(f'# TYPE {self.PREFIX}_{name}_total counter')
+            for (counter_name, labels), value in sorted(self.counters.items()):
+                if counter_name != name:
+                    continue
+                label_text = ','.join(f'{k}="{v}"' for k, v in labels)
+                lines.append(f'{self.PREFIX}_{name}_total{{{label_text}}} {value}')
+
+        lines.append(f'# TYPE {self.PREFIX}_cache_hit_ratio gauge')
+        for cache, rate in sorted(self.summary()['cache_hit_rates'].items()):
+            lines.append(f'{self.PREFIX}_cache_hit_ratio{{cache="{cache}"}} {rate:.6f}')
+
+        peak = self.peak_memory_bytes()
+        if peak is not None:
+            lines.append(f'# TYPE {self.PREFIX}_peak_memory_bytes gauge')
+            lines.append(f'{self.PREFIX}_peak_memory_bytes {peak}')
+
+        # Write then rename so scrapers never read a partial file
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, path)
+
+    def write(self, path: str):
+        if path.endswith('.prom'):
+            self.write_prometheus(path)
+        else:
+            self.write_trace(path)
+
+# Process-wide profiler used by the instrumented modules
+profiler = Profiler()
@@ -0,0 +1,28 @@
+"""Streaming ingest shared by the headless run, --accounts workers and the dashboard sync."""
+from typing import List, Dict, Iterable, Optional
+from tasks.task_extractor import TaskExtractor
+from tasks.task_store import TaskStore
+from tasks.task_export import iter_chunks
+
+def ingest_emails(emails: Iterable[Dict], task_extractor: TaskExtractor, task_store: TaskStore,
+                  stats=None, sinks: Iterable = (), chunk_size: int = 500,
+                  max_reextract: Optional[int] = None) -> List[str]:
+    """Extract, store and count a stream of emails one chunk at a time.
+
+    Each chunk is also passed to every sink (e.g. RollupStore.add_emails), so
+    memory stays bounded by chunk_size rather than the mailbox. At most
+    max_reextract emails from an older extractor version are re-extracted;
+    the rest keep their stored tasks until a later run. Returns the IDs of
+    all emails seen, for loading their stored tasks afterwards.
+    """
+    message_ids = []
+    for chunk in iter_chunks(emails, chunk_size):
+        reextracted = task_extractor.save_new_tasks(chunk, task_store, max_reextract)
+        if max_reextract is not None:
+            max_reextract -= reextracted
+        if stats is not None:
+            stats.add_all(chunk)
+        for sink in sinks:
+            sink(chunk)
+        message_ids.extend(email['id'] for email in chunk)
+    return message_ids
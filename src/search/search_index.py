@@ -0,0 +1,113 @@
+from typing import List, Dict
+import sqlite3
+import re
+
+class SearchIndex:
+    """Local full-text index over emails and their extracted tasks (SQLite FTS5)."""
+
+    # bm25 column weights, in email_fts column order
+    COLUMN_WEIGHTS = {'subject': 5.0, 'sender': 3.0, 'snippet': 2.0, 'body': 1.0, 'tasks': 4.0}
+    QUERY_TOKEN = re.compile(r'"([^"]+)"|(\w+\*?)', re.UNICODE)
+
+    def __init__(self, db_file: str = 'search.db'):
+        self.db_file = db_file
+        self.conn = sqlite3.connect(self.db_file)
+        self._create_tables()
+
+    def _create_tables(self):
+        with self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS messages (
+                    rowid INTEGER PRIMARY KEY,
+                    message_id TEXT UNIQUE NOT NULL
+                )''')
+            self.conn.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS email_fts USING fts5(
+                    subject, sender, snippet, body, tasks,
+                    tokenize = 'unicode61 remove_diacritics 2',
+                    prefix = '2 3'
+                )''')
+            # Persist column weights as the default rank so queries can ORDER BY rank
+            weights = ', '.join(str(w) for w in self.COLUMN_WEIGHTS.values())
+            self.conn.execute(
+                "INSERT INTO email_fts (email_fts, rank) VALUES ('rank', ?)", (f'bm25({weights})',))
+
+    def close(self):
+        self.conn.close()
+
+    def add_emails(self, emails: List[Dict]) -> int:
+        """Index emails that are not indexed yet. Returns the number of new emails."""
+        added = 0
+        with self.conn:
+            for email in emails:
+                cursor = self.conn.execute(
+                    'INSERT OR IGNORE INTO messages (message_id) VALUES (?)', (email['id'],))
+                if not cursor.rowcount:
+                    continue
+                self.conn.execute(
+                    'INSERT INTO email_fts (rowid, subject, sender, snippet, body, tasks) VALUES (?, ?, ?, ?, ?, ?)',
+                    (cursor.lastrowid, email.get('subject', ''), email.get('from', ''),
+                     email.get('snippet', ''), email.get('body', ''), ''))
+                added += 1
+        return added
+
+    def add_tasks(self, tasks: List[Dict]):
+        """Attach extracted task text to the indexed emails it came from."""
+        texts = {}
+        for task in tasks:
+            if 'message_id' in task:
+                texts.setdefault(task['message_id'], []).append(task['text'])
+
+        with self.conn:
+            for message_id, task_texts in texts.items():
+                self.conn.execute('''
+                    UPDATE email_fts SET tasks = ?
+                    WHERE rowid = (SELECT rowid FROM messages WHERE message_id = ?)''',
+                    ('\n'.join(task_texts), message_id))
+
+    def _build_match(self, query: str) -> str:
+        """Turn user input into an FTS5 query: "quoted phrases", word* prefixes, AND-ed terms."""
+        terms = []
+        for phrase, word in self.QUERY_TOKEN.findall(query):
+            if phrase:
+                terms.append('"' + phrase.replace('"', '') + '"')
+            elif word.endswith('*'):
+                terms.append('"' + word[:-1] + '"*')
+            else:
+                terms.append('"' + word + '"')
+        return ' '.join(terms)
+
+    def search(self, query: str, limit: int = 50) -> List[Dict]:
+        """Ranked search over subject, sender, snippet, body and task text."""
+        match = self._build_match(query)
+        if not match:
+            return []
+
+        rows = self.conn.execute('''
+            SELECT messages.message_id, email_fts.subject, email_fts.sender,
+                   snippet(email_fts, -1, '[', ']', '...', 12), email_fts.rank
+            FROM email_fts JOIN messages ON messages.rowid = email_fts.rowid
+            WHERE email_fts MATCH ?
+            ORDER BY email_fts.rank
+            LIMIT ?''', (match, limit))
+
+        return [{
+            'message_id': message_id,
+            'subject': subject,
+            'from': sender,
+            'match': match_snippet,
+            'score': -score
+        } for message_id, subject, sender, match_snippet, score in rows]
+
+    def search_message_ids(self, query: str) -> List[str]:
+        """Every matching message ID, unranked, for filtering; use search() for ranked results."""
+        match = self._build_match(query)
+        if not match:
+            return []
+
+        # Without ORDER BY rank, FTS5 need not score each hit, and no LIMIT means no match is dropped
+        rows = self.conn.execute('''
+            SELECT messages.message_id
+            FROM email_fts JOIN messages ON messages.rowid = email_fts.rowid
+            WHERE email_fts MATCH ?''', (match,))
+        return [message_id for (message_id,) in rows]
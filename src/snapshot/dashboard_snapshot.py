@@ -0,0 +1,66 @@
+"""Compact dashboard snapshot for instant warm starts.
+
+After each successful sync the prioritized tasks are written as an Arrow
+IPC file, with the analytics results in its schema metadata. On the next
+launch the file is memory-mapped and rendered before any network or
+extraction work, so perceived startup does not depend on mailbox size.
+"""
+from typing import List, Dict, Optional
+from datetime import datetime
+from tasks.task_export import EXPORT_SCHEMA, normalize_row
+import json
+import os
+
+SNAPSHOT_VERSION = 2
+
+def _arrow_schema(pa, metadata: Dict):
+    arrow_types = {'string': pa.string(), 'double': pa.float64(), 'int64': pa.int64()}
+    return pa.schema([(name, arrow_types[field_type]) for name, field_type in EXPORT_SCHEMA],
+                     metadata={k: json.dumps(v) for k, v in metadata.items()})
+
+def write_snapshot(path: str, tasks: List[Dict], response_times: Dict, patterns: Dict) -> bool:
+    """Write the snapshot atomically. Returns False if pyarrow is not installed."""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return False
+
+    metadata = {
+        'version': SNAPSHOT_VERSION,
+        'created': datetime.now().isoformat(),
+        'response_times': response_times,
+        # JSON object keys must be strings; peak hours are restored to ints on load
+        'patterns': {name: {str(k): v for k, v in values.items()} for name, values in patterns.items()}
+    }
+    schema = _arrow_schema(pa, metadata)
+    table = pa.Table.from_pylist([normalize_row(task) for task in tasks], schema=schema)
+
+    tmp_path = path + '.tmp'
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+    return True
+
+def load_snapshot(path: str) -> Optional[Dict]:
+    """Memory-map a snapshot. Returns None if it is missing, unreadable or from another version."""
+    if not os.path.exists(path):
+        return None
+    try:
+        import pyarrow as pa
+        table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+        metadata = {k.decode(): json.loads(v) for k, v in (table.schema.metadata or {}).items()}
+        if metadata.get('version') != SNAPSHOT_VERSION:
+            return None
+    except Exception as e:
+        print(f'Ignoring unreadable snapshot {path}: {e}')
+        return None
+
+    patterns = metadata['patterns']
+    patterns['peak_hours'] = {int(k): v for k, v in patterns.get('peak_hours', {}).items()}
+    return {
+        'tasks': table.to_pylist(),
+        'response_times': metadata['response_times'],
+        'patterns': patterns,
+        'created': metadata['created']
+    }
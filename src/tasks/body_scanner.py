@@ -0,0 +1,90 @@
+"""Bounded, HTML-aware text extraction for task and deadline detection.
+
+Only a leading window of the body plus short chunks around deadline
+phrases are scanned, and signatures and mailing-list footers are cut
+off, so the cost per message stays bounded however long the email is.
+"""
+from html.parser import HTMLParser
+import re
+
+BLOCK_TAGS = {'p', 'br', 'div', 'li', 'tr', 'td', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+              'blockquote', 'pre', 'table', 'ul', 'ol', 'hr'}
+SKIP_TAGS = {'script', 'style', 'head', 'title', 'noscript'}
+
+# Lines that start a signature or a bulk-mail footer
+FOOTER_PATTERN = re.compile(
+    r'^(?:--\s*$|__+\s*$|sent from my |get outlook for |unsubscribe\b|to unsubscribe|'
+    r'you are receiving this|you received this|manage (?:your )?(?:email )?preferences|'
+    r'this email (?:and any attachments )?(?:is|was) (?:intended|sent)|confidentiality notice)',
+    re.IGNORECASE | re.MULTILINE)
+
+DEADLINE_PATTERN = re.compile(
+    r'\b(?:due|deadline|no later than|by (?:end of|close of|eod|cob|tomorrow|next|monday|tuesday|'
+    r'wednesday|thursday|friday|saturday|sunday|jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec|\d))',
+    re.IGNORECASE)
+
+class _TextExtractor(HTMLParser):
+    def __init__(self, max_chars: int):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.parts = []
+        self.length = 0
+        self.skip_depth = 0
+
+    @property
+    def full(self) -> bool:
+        return self.length >= self.max_chars
+
+    def _append(self, text: str):
+        self.parts.append(text)
+        self.length += len(text)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag in BLOCK_TAGS:
+            self._append('\n')
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self._append(data)
+
+def html_to_text(html: str, max_chars: int = 50000, chunk_size: int = 8192) -> str:
+    """Convert HTML to plain text, feeding the tokenizer in chunks and stopping after max_chars of text."""
+    parser = _TextExtractor(max_chars)
+    for i in range(0, len(html), chunk_size):
+        parser.feed(html[i:i + chunk_size])
+        if parser.full:
+            break
+    parser.close()
+    text = ''.join(parser.parts)[:max_chars]
+    # Collapse the whitespace runs left behind by markup
+    text = re.sub(r'[ \t\r\f\v]+', ' ', text)
+    return re.sub(r'\n\s*\n+', '\n\n', text).strip()
+
+def strip_footer(text: str) -> str:
+    """Cut the text at the first signature delimiter or mailing-list footer line."""
+    match = FOOTER_PATTERN.search(text)
+    return text[:match.start()].rstrip() if match else text
+
+def scan_text(text: str, window: int = 2000, context: int = 200, max_chars: int = 20000) -> str:
+    """The leading window of text plus the chunks around deadline phrases further down."""
+    text = strip_footer(text[:max_chars])
+    if len(text) <= window:
+        return text
+
+    spans = []
+    for match in DEADLINE_PATTERN.finditer(text, window):
+        start, end = max(window, match.start() - context), min(len(text), match.end() + context)
+        if spans and start <= spans[-1][1]:
+            spans[-1][1] = end
+        else:
+            spans.append([start, end])
+
+    return '\n...\n'.join([text[:window]] + [text[start:end] for start, end in spans])
@@ -0,0 +1,133 @@
+"""Near-duplicate task collapsing with MinHash signatures and LSH banding.
+
+Recurring notifications produce many tasks whose text differs only in
+numbers, names or dates. Each task text is reduced to a MinHash signature;
+tasks from the same sender sharing any LSH band become candidates and are
+merged when their estimated Jaccard similarity reaches the threshold. Work is roughly linear
+in the number of tasks, and signatures are stored with the tasks so only
+new tasks are hashed on later syncs.
+"""
+from typing import List, Dict, Optional, Tuple
+from array import array
+from datetime import datetime
+from email.utils import parseaddr
+import random
+import re
+import zlib
+
+MERSENNE_PRIME = (1 << 61) - 1
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+class TaskDeduplicator:
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 8,
+                 shingle_size: int = 3, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError('num_perm must be a multiple of bands')
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        # Universal hash family h(x) = (a * x + b) mod p; fixed seed so stored signatures stay valid
+        rng = random.Random(seed)
+        self.permutations = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(MERSENNE_PRIME))
+                             for _ in range(num_perm)]
+
+    def _shingles(self, text: str) -> set:
+        # Digits are masked so "Invoice #1234" and "Invoice #5678" look alike
+        tokens = TOKEN_PATTERN.findall(re.sub(r'\d+', '#', text.lower()))
+        if len(tokens) < self.shingle_size:
+            return {' '.join(tokens)}
+        return {' '.join(tokens[i:i + self.shingle_size]) for i in range(len(tokens) - self.shingle_size + 1)}
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        hashes = [zlib.crc32(shingle.encode('utf-8')) for shingle in self._shingles(text)]
+        return tuple(min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in self.permutations)
+
+    @staticmethod
+    def pack(signature: Tuple[int, ...]) -> bytes:
+        return array('Q', signature).tobytes()
+
+    @staticmethod
+    def unpack(data: bytes) -> Tuple[int, ...]:
+        return tuple(array('Q', data))
+
+    def similarity(self, first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+        """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+        return sum(a == b for a, b in zip(first, second)) / self.num_perm
+
+    def _band_keys(self, signature: Tuple[int, ...]) -> List[Tuple]:
+        return [(band, signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+    def cluster(self, signatures: List[Tuple[int, ...]], groups: Optional[List] = None) -> List[int]:
+        """Cluster index for each signature; only signatures in the same group are merged."""
+        buckets = {}
+        clusters = []
+        representatives = []
+        for i, signature in enumerate(signatures):
+            group = groups[i] if groups else None
+            assigned = None
+            keys = [(group,) + key for key in self._band_keys(signature)]
+            for key in keys:
+                for candidate in buckets.get(key, ()):
+                    if self.similarity(signature, representatives[candidate]) >= self.threshold:
+                        assigned = candidate
+                        break
+                if assigned is not None:
+                    break
+            if assigned is None:
+                assigned = len(representatives)
+                representatives.append(signature)
+                for key in keys:
+                    buckets.setdefault(key, []).append(assigned)
+            clusters.append(assigned)
+        return clusters
+
+    def collapse(self, tasks: List[Dict], signatures: List[Tuple[int, ...]]) -> List[Dict]:
+        """Keep the first task of each cluster, with duplicate_count and the cluster's earliest deadline.
+
+        Tasks are only merged with tasks of the same status and sender: a new
+        pending task never disappears into a completed one, and the same
+        request from different people stays separate rows, since completing a
+        row completes every task collapsed into it.
+        """
+        groups = [(task.get('status', 'pending'), parseaddr(task.get('from', ''))[1].lower()) for task in tasks]
+        clusters = self.cluster(signatures, groups)
+        members = {}
+        for task, cluster in zip(tasks, clusters):
+            members.setdefault(cluster, []).append(task)
+
+        now = datetime.now().isoformat()
+        collapsed = []
+        for cluster_tasks in members.values():
+            representative = dict(cluster_tasks[0])
+            representative['duplicate_count'] = len(cluster_tasks)
+            if len(cluster_tasks) > 1:
+                representative['duplicate_keys'] = [[t['message_id'], t['source']] for t in cluster_tasks[1:]]
+                # Earliest deadline still ahead; a passed deadline would hide the whole cluster
+                deadlines = [t for t in cluster_tasks if t.get('deadline')]
+                upcoming = [t for t in deadlines if t['deadline'] >= now] or deadlines
+                if upcoming:
+                    earliest = min(upcoming, key=lambda t: t['deadline'])
+                    for key in ('deadline', 'deadline_confidence', 'deadline_context'):
+                        if key in earliest:
+                            representative[key] = earliest[key]
+            collapsed.append(representative)
+        return collapsed
+
+    def collapse_stored(self, tasks: List[Dict], task_store) -> List[Dict]:
+        """Collapse tasks loaded from task_store, hashing and storing only tasks without a signature."""
+        stored = task_store.load_signatures()
+        missing = {}
+        signatures = []
+        for task in tasks:
+            key = (task['message_id'], task['source'])
+            if key in stored:
+                signature = self.unpack(stored[key])
+            else:
+                signature = self.signature(task['text'])
+                missing[key] = self.pack(signature)
+            signatures.append(signature)
+        if missing:
+            task_store.save_signatures(missing)
+        return self.collapse(tasks, signatures)
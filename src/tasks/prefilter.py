@@ -0,0 +1,95 @@
+"""Cheap header-based pre-filter that runs ahead of task extraction.
+
+Newsletters and automated notifications make up most of a mailbox and are
+full of words like "please" and "update". They can be recognized from
+their headers and Gmail category labels alone, so they skip the keyword,
+deadline and date parsing work entirely. Senders whose mail repeatedly
+carries bulk headers and never yields a task are remembered, and their
+other mail outside the Primary tab is skipped too until the record expires.
+"""
+from typing import Dict, Optional
+from email.utils import parseaddr
+import json
+import os
+import re
+import time
+
+class BulkMailFilter:
+    # Updates and Forums hold invoices, confirmations and threads that carry real deadlines
+    SKIP_LABELS = {'CATEGORY_PROMOTIONS', 'CATEGORY_SOCIAL'}
+    # Only these say the message itself is bulk; labels and sender names are guesses
+    LEARN_REASONS = {'list-unsubscribe', 'precedence', 'auto-submitted'}
+    BULK_PRECEDENCE = {'bulk', 'list', 'junk'}
+    NO_REPLY_PATTERN = re.compile(r'^(?:no-?reply|do-?not-?reply|notifications?|mailer-daemon)@', re.IGNORECASE)
+
+    def __init__(self, skip_cache_file: Optional[str] = 'sender_skip_cache.json', learn_threshold: int = 3,
+                 expire_days: float = 30):
+        # sender -> [messages with bulk headers, messages that produced tasks, when counting started]
+        self.skip_cache_file = skip_cache_file
+        self.learn_threshold = learn_threshold
+        # Records start over after expire_days, so a skipped sender's mail is extracted again
+        self.expire_seconds = expire_days * 86400
+        self.sender_stats = self._load_cache()
+        self.dirty = False
+
+    def _load_cache(self) -> Dict:
+        if self.skip_cache_file and os.path.exists(self.skip_cache_file):
+            try:
+                with open(self.skip_cache_file, 'r') as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                print(f'Ignoring unreadable sender skip cache: {e}')
+        return {}
+
+    def save(self):
+        if not self.skip_cache_file or not self.dirty:
+            return
+        tmp_path = self.skip_cache_file + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.sender_stats, f)
+        os.replace(tmp_path, self.skip_cache_file)
+        self.dirty = False
+
+    @staticmethod
+    def sender(email: Dict) -> str:
+        return parseaddr(email.get('from', ''))[1].lower()
+
+    def classify(self, email: Dict) -> Optional[str]:
+        """Return why the email should be skipped, or None if it needs full extraction."""
+        if email.get('list_unsubscribe'):
+            return 'list-unsubscribe'
+        if email.get('precedence', '').strip().lower() in self.BULK_PRECEDENCE:
+            return 'precedence'
+        auto_submitted = email.get('auto_submitted', '').strip().lower()
+        if auto_submitted and auto_submitted != 'no':
+            return 'auto-submitted'
+        if self.SKIP_LABELS.intersection(email.get('labels', [])):
+            return 'category'
+
+        sender = self.sender(email)
+        if self.NO_REPLY_PATTERN.match(sender):
+            return 'no-reply'
+        if 'CATEGORY_PERSONAL' in email.get('labels', []):
+            return None
+        stats = self._stats(sender)
+        if stats and stats[0] >= self.learn_threshold and not stats[1]:
+            return 'sender'
+        return None
+
+    def _stats(self, sender: str) -> Optional[list]:
+        stats = self.sender_stats.get(sender)
+        # Records from older caches have no start time and may have counted category hits
+        if stats is None or len(stats) < 3 or time.time() - stats[2] > self.expire_seconds:
+            return None
+        return stats
+
+    def learn(self, email: Dict, reason: Optional[str] = None, has_tasks: bool = False):
+        """Update the sender's record after classification (reason) or extraction (has_tasks)."""
+        if reason not in self.LEARN_REASONS and not has_tasks:
+            return
+        sender = self.sender(email)
+        stats = self._stats(sender)
+        if stats is None:
+            stats = self.sender_stats[sender] = [0, 0, time.time()]
+        stats[0 if reason in self.LEARN_REASONS else 1] += 1
+        self.dirty = True
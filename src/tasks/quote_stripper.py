@@ -0,0 +1,79 @@
+"""Isolate the new content of a reply or forward.
+
+Replies carry the earlier messages of their thread as ">"-quoted lines or
+below an "On ... wrote:" / "Original Message" header. Cutting those off
+means each piece of thread text is analyzed once, by the message that
+introduced it.
+"""
+from typing import Dict
+import html
+import re
+
+# Headers that start the quoted history of a reply
+REPLY_HEADER_PATTERN = re.compile(
+    r'^(?:On\s[^\n]{0,200}(?:\n[^\n]{0,100})?\bwrote:|-{2,}\s*Original Message\s*-{2,}|'
+    r'From:\s.*\n(?:.*\n)?(?:Sent|Date):\s)',
+    re.IGNORECASE | re.MULTILINE)
+FORWARD_HEADER_PATTERN = re.compile(
+    r'^(?:-{2,}\s*Forwarded message\s*-{2,}|Begin forwarded message:)',
+    re.IGNORECASE | re.MULTILINE)
+# Gmail snippets are one HTML-escaped line, so quote headers appear mid-line there. Sentences
+# use "on ... wrote:" too, so only a capitalized "On <date> ... <name or address> wrote:" counts.
+_WEEKDAY = r'(?:Mon|Tue|Wed|Thu|Fri|Sat|Sun)[a-z]*\.?'
+_MONTH = r'(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?'
+_DATE = rf'(?:{_WEEKDAY}|{_MONTH}\s\d{{1,2}}|\d{{1,2}}\s{_MONTH}|\d{{1,4}}[/.-]\d{{1,2}}[/.-]\d{{1,4}})'
+_AUTHOR = r'(?:<[^<>\s]+@[^<>\s]+>|[\w.+-]+@[\w-]+\.[\w.-]+|[A-Z][\w.\'-]*)'
+INLINE_REPLY_HEADER_PATTERN = re.compile(
+    rf'(?:\bOn\s{_DATE}.{{0,150}}?{_AUTHOR}\s+wrote:|(?i:-{{2,}}\s*Original Message\s*-{{2,}})|'
+    r'\bFrom:\s.{0,200}?\b(?:Sent|Date):\s)')
+INLINE_FORWARD_HEADER_PATTERN = re.compile(
+    r'(?:-{2,}\s*Forwarded message\s*-{2,}|\bBegin forwarded message:)', re.IGNORECASE)
+# A ">" mid-sentence may be a comparison; a quote starts the snippet or follows a finished sentence
+INLINE_QUOTE_PATTERN = re.compile(r'(?:^|(?<=[.!?:;]))\s*>+\s')
+SUBJECT_PREFIX_PATTERN = re.compile(r'^(?:\s*(?:re|fw|fwd|aw|sv)\s*(?:\[\d+\])?:\s*)+', re.IGNORECASE)
+
+def strip_quoted(text: str) -> str:
+    """Return only the text the sender wrote in this message.
+
+    A bare forward (nothing written above the forwarded block) keeps the
+    forwarded content, since it is new to this thread.
+    """
+    if not text:
+        return text
+
+    forward = FORWARD_HEADER_PATTERN.search(text)
+    if forward:
+        note = strip_quoted(text[:forward.start()])
+        return note if note else text[forward.end():].strip()
+
+    reply = REPLY_HEADER_PATTERN.search(text)
+    if reply:
+        text = text[:reply.start()]
+    return '\n'.join(line for line in text.splitlines() if not line.lstrip().startswith('>')).strip()
+
+def strip_quoted_snippet(snippet: str) -> str:
+    """strip_quoted for a Gmail snippet: unescaped, with inline reply headers and quotes cut off."""
+    if not snippet:
+        return snippet
+    text = html.unescape(snippet)
+
+    forward = INLINE_FORWARD_HEADER_PATTERN.search(text)
+    if forward:
+        note = strip_quoted_snippet(text[:forward.start()])
+        return note if note else text[forward.end():].strip()
+
+    reply = INLINE_REPLY_HEADER_PATTERN.search(text)
+    if reply:
+        text = text[:reply.start()]
+    quote = INLINE_QUOTE_PATTERN.search(text)
+    if quote:
+        text = text[:quote.start()]
+    return text.strip()
+
+def normalize_subject(subject: str) -> str:
+    """Subject without Re:/Fwd: prefixes, for grouping messages into threads."""
+    return SUBJECT_PREFIX_PATTERN.sub('', subject or '').strip().lower()
+
+def thread_key(email: Dict) -> str:
+    """Gmail's threadId where available, otherwise the normalized subject."""
+    return email.get('thread_id') or 'subject:' + normalize_subject(email.get('subject', ''))
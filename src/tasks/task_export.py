@@ -0,0 +1,130 @@
+from typing import List, Dict, Iterable, Optional, Callable
+import csv
+import gzip
+import json
+
+# Explicit export schema: (field, type). Tasks may carry other keys; they are not exported.
+EXPORT_SCHEMA = [
+    ('message_id', 'string'),
+    ('source', 'string'),
+    ('priority', 'string'),
+    ('text', 'string'),
+    ('category', 'string'),
+    ('deadline', 'string'),
+    ('deadline_context', 'string'),
+    ('deadline_confidence', 'double'),
+    ('confidence', 'double'),
+    ('status', 'string'),
+    ('from', 'string'),
+    ('account', 'string'),
+    ('duplicate_count', 'int64'),
+]
+
+EXPORT_FORMATS = ['csv', 'jsonl', 'parquet']
+
+def normalize_row(task: Dict, schema: List = EXPORT_SCHEMA) -> Dict:
+    """Coerce a task to the (field, type) schema: missing strings become '', missing numbers None."""
+    row = {}
+    for name, field_type in schema:
+        value = task.get(name)
+        if field_type == 'double':
+            row[name] = float(value) if value not in (None, '') else None
+        elif field_type == 'int64':
+            row[name] = int(value) if value not in (None, '') else None
+        else:
+            row[name] = '' if value is None else str(value)
+    return row
+
+class TaskExporter:
+    """Stream task chunks to CSV, JSON Lines or Parquet, optionally compressed.
+
+    Rows follow EXPORT_SCHEMA unless another (field, type) schema is given.
+    """
+
+    def __init__(self, file_name: str, fmt: Optional[str] = None, compress: Optional[bool] = None,
+                 schema: Optional[List] = None):
+        self.file_name = file_name
+        self.compress = file_name.endswith('.gz') if compress is None else compress
+        self.fmt = fmt or self._format_from_name(file_name)
+        if self.fmt not in EXPORT_FORMATS:
+            raise ValueError(f'Unsupported export format: {self.fmt}')
+        self.schema = schema or EXPORT_SCHEMA
+        self.fields = [name for name, _ in self.schema]
+
+    @staticmethod
+    def _format_from_name(file_name: str) -> str:
+        name = file_name[:-3] if file_name.endswith('.gz') else file_name
+        return name.rsplit('.', 1)[-1].lower()
+
+    def _normalize(self, task: Dict) -> Dict:
+        return normalize_row(task, self.schema)
+
+    def _open_text(self):
+        if self.compress:
+            return gzip.open(self.file_name, 'wt', newline='', encoding='utf-8')
+        return open(self.file_name, 'w', newline='', encoding='utf-8')
+
+    def export(self, chunks: Iterable[List[Dict]], progress: Optional[Callable[[int], None]] = None) -> int:
+        """Write task chunks one at a time. Returns the number of exported rows."""
+        writers = {
+            'csv': self._export_csv,
+            'jsonl': self._export_jsonl,
+            'parquet': self._export_parquet
+        }
+        return writers[self.fmt](chunks, progress)
+
+    def _export_csv(self, chunks, progress) -> int:
+        count = 0
+        with self._open_text() as f:
+            writer = csv.DictWriter(f, fieldnames=self.fields, extrasaction='ignore')
+            writer.writeheader()
+            for chunk in chunks:
+                writer.writerows(self._normalize(task) for task in chunk)
+                count += len(chunk)
+                if progress:
+                    progress(count)
+        return count
+
+    def _export_jsonl(self, chunks, progress) -> int:
+        count = 0
+        with self._open_text() as f:
+            for chunk in chunks:
+                for task in chunk:
+                    f.write(json.dumps(self._normalize(task)))
+                    f.write('\n')
+                count += len(chunk)
+                if progress:
+                    progress(count)
+        return count
+
+    def _export_parquet(self, chunks, progress) -> int:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError('Parquet export requires pyarrow (pip install pyarrow)')
+
+        arrow_types = {'string': pa.string(), 'double': pa.float64(), 'int64': pa.int64()}
+        schema = pa.schema([(name, arrow_types[field_type]) for name, field_type in self.schema])
+
+        count = 0
+        with pq.ParquetWriter(self.file_name, schema,
+                              compression='zstd' if self.compress else 'snappy') as writer:
+            for chunk in chunks:
+                rows = [self._normalize(task) for task in chunk]
+                writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+                count += len(chunk)
+                if progress:
+                    progress(count)
+        return count
+
+def iter_chunks(tasks: Iterable[Dict], chunk_size: int = 500) -> Iterable[List[Dict]]:
+    """Split a task list or iterator (or any stream of dicts) into chunks."""
+    chunk = []
+    for task in tasks:
+        chunk.append(task)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -1,14 +1,31 @@
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
 from datetime import datetime, timedelta
-from auth.gmail_auth import GmailAuth
+from auth.session import get_session
 import re
 from dateutil import parser
 from dateutil.relativedelta import relativedelta
 from functools import lru_cache
+from metrics.profiler import profiler
+from tasks.body_scanner import scan_text
+from tasks.quote_stripper import strip_quoted, strip_quoted_snippet, normalize_subject, thread_key
 
 class TaskExtractor:
-    def __init__(self):
-        self.auth = GmailAuth()
+    # Bump whenever extraction rules change so stored tasks get re-extracted
+    EXTRACTOR_VERSION = 6
+
+    def __init__(self, scan_body: bool = False, body_window: int = 2000, body_context: int = 200,
+                 max_body_chars: int = 20000, bulk_filter=None, deduplicator=None):
+        self.auth = None
+        # Optional BulkMailFilter; emails it flags skip extraction entirely
+        self.bulk_filter = bulk_filter
+        # Optional TaskDeduplicator; near-duplicate stored tasks are collapsed on load
+        self.deduplicator = deduplicator
+        # Body scanning reads the leading window of the body plus the context around deadline
+        # phrases instead of just the snippet; max_body_chars bounds the work per message
+        self.scan_body = scan_body
+        self.body_window = body_window
+        self.body_context = body_context
+        self.max_body_chars = max_body_chars
         self.service = None
         self.task_categories = ['Work', 'Personal', 'Meeting', 'Follow-up', 'Review', 'Other']
         # Enhanced task keywords with more comprehensive patterns
@@ -55,49 +72,147 @@ class TaskExtractor:
         self.compiled_patterns = {k: re.compile(v, re.IGNORECASE) for k, v in self.date_patterns.items()}
 
     def connect(self) -> bool:
-        if self.auth.authenticate():
-            self.service = self.auth.get_service()
+        session = get_session()
+        if session:
+            self.auth = session.auth
+            self.service = session.service
             return True
         return False
 
+    @profiler.timed('extract_tasks')
     def extract_tasks(self, emails: List[Dict]) -> List[Dict]:
-        tasks = []
+        return list(self.iter_tasks(emails))
+
+    def iter_tasks(self, emails: Iterable[Dict], seen: Optional[Dict] = None, task_store=None) -> Iterator[Dict]:
+        """Yield tasks as emails stream in, without holding more than one email.
+
+        seen maps each (thread, source, text) task key claimed so far to its
+        message ID. With a task_store, keys claimed by earlier syncs count too.
+        """
+        # Replies repeat the thread's subject, so each thread yields each task once
+        seen = {} if seen is None else seen
         for email in emails:
+            if self.bulk_filter:
+                reason = self.bulk_filter.classify(email)
+                if reason:
+                    self.bulk_filter.learn(email, reason=reason)
+                    profiler.count('prefiltered', reason=reason)
+                    continue
+            has_tasks = False
+
             # Extract tasks from email subject and body with improved content analysis
             subject = email['subject']
-            body = email['snippet']
+            body = self._scan_text(email)
+            thread = thread_key(email)
+            
+            # Extract deadline from full email body for better accuracy
+            deadline_info = self._extract_deadline(body)
             
             # Check subject line first (higher priority)
             subject_task = self._analyze_content(subject, is_subject=True)
-            if subject_task:
-                # Extract deadline from full email body for better accuracy
-                deadline_info = self._extract_deadline(body)
+            if subject_task and self._first_in_thread(seen, task_store, email['id'],
+                                                      (thread, 'subject', normalize_subject(subject))):
                 if deadline_info['date']:
                     subject_task['deadline'] = deadline_info['date']
                     subject_task['deadline_confidence'] = deadline_info['confidence']
                     subject_task['deadline_context'] = deadline_info['context']
                 
                 subject_task.update({
+                    'message_id': email['id'],
                     'from': email['from'],
                     'source': 'subject'
                 })
-                tasks.append(subject_task)
+                has_tasks = True
+                yield subject_task
             
             # Then check email body
             body_task = self._analyze_content(body, is_subject=False)
-            if body_task:
+            if body_task and self._first_in_thread(seen, task_store, email['id'],
+                                                   (thread, 'body', body.strip().lower())):
                 # Use the same deadline info for body task if available
                 if 'deadline' not in body_task and deadline_info['date']:
                     body_task['deadline'] = deadline_info['date']
                     body_task['deadline_confidence'] = deadline_info['confidence']
                     body_task['deadline_context'] = deadline_info['context']
                 
+                # Keep the table readable: show the snippet, the deadline context carries the rest
+                body_task['text'] = strip_quoted_snippet(email['snippet']) or body_task['text'][:200]
                 body_task.update({
+                    'message_id': email['id'],
                     'from': email['from'],
                     'source': 'body'
                 })
-                tasks.append(body_task)
-        
+                has_tasks = True
+                yield body_task
+
+            if self.bulk_filter:
+                self.bulk_filter.learn(email, has_tasks=has_tasks)
+
+        if self.bulk_filter:
+            self.bulk_filter.save()
+
+    def _first_in_thread(self, seen: Dict, task_store, message_id: str, key: Tuple[str, str, str]) -> bool:
+        owner = seen.get(key)
+        if owner is None and task_store is not None:
+            owner = task_store.thread_task_owner(*key)
+        # A message being re-extracted may keep its own claim
+        if owner is not None and owner != message_id:
+            profiler.count('duplicate_tasks', source=key[1])
+            return False
+        seen[key] = message_id
+        return True
+
+    @property
+    def extractor_version(self) -> str:
+        """Stored with each extraction; scanning modes differ so they are versioned separately."""
+        modes = [mode for mode, enabled in (('body', self.scan_body), ('prefilter', self.bulk_filter))
+                 if enabled]
+        return '+'.join([str(self.EXTRACTOR_VERSION)] + modes)
+
+    @profiler.timed('scan_body')
+    def _scan_text(self, email: Dict) -> str:
+        """The new content of the email: quoted history and forwarded headers are cut off."""
+        if not self.scan_body or not email.get('body'):
+            text = strip_quoted_snippet(email['snippet'])
+        else:
+            text = scan_text(strip_quoted(email['body'][:self.max_body_chars]), window=self.body_window,
+                             context=self.body_context, max_chars=self.max_body_chars)
+        profiler.count('scanned_chars', len(text))
+        return text
+
+    @profiler.timed('extract_new_tasks')
+    def extract_new_tasks(self, emails: List[Dict], task_store, max_reextract: Optional[int] = None) -> List[Dict]:
+        """Extract tasks only for emails the task store has not seen with this extractor version."""
+        self.save_new_tasks(emails, task_store, max_reextract)
+        return self.load_stored_tasks([email['id'] for email in emails], task_store)
+
+    @profiler.timed('save_new_tasks')
+    def save_new_tasks(self, emails: List[Dict], task_store, max_reextract: Optional[int] = None) -> int:
+        """Extract and store tasks for new or stale emails, e.g. one chunk of a streamed mailbox.
+
+        Thread task keys are stored with the tasks, so a reply fetched by a
+        later sync does not repeat a task its thread already produced.
+        Returns how many stale emails were re-extracted.
+        """
+        new_emails, stale_emails = task_store.unprocessed(emails, self.extractor_version, max_reextract)
+        pending_emails = new_emails + stale_emails
+        profiler.cache_lookup('task_store', True, len(emails) - len(pending_emails))
+        profiler.cache_lookup('task_store', False, len(pending_emails))
+        if pending_emails:
+            thread_keys = {}
+            with profiler.span('extract_tasks'):
+                tasks = list(self.iter_tasks(pending_emails, thread_keys, task_store))
+            task_store.save_extraction(pending_emails, tasks, self.extractor_version, thread_keys)
+        return len(stale_emails)
+
+    def load_stored_tasks(self, message_ids: Iterable[str], task_store) -> List[Dict]:
+        """Stored tasks for message_ids, with near-duplicates collapsed if a deduplicator is set."""
+        tasks = task_store.load_tasks(message_ids)
+        if self.deduplicator:
+            with profiler.span('dedup_tasks'):
+                collapsed = self.deduplicator.collapse_stored(tasks, task_store)
+            profiler.count('duplicate_tasks', len(tasks) - len(collapsed), source='near-duplicate')
+            tasks = collapsed
         return tasks
 
     def _analyze_content(self, text: str, is_subject: bool = False) -> Optional[Dict]:
@@ -206,6 +321,7 @@ class TaskExtractor:
                 return category
         return 'Other'
 
+    @profiler.timed('prioritize_tasks')
     def prioritize_tasks(self, tasks: List[Dict], sort_by: str = 'priority', reverse: bool = True) -> List[Dict]:
         # Process tasks in batches for better performance
         batch_size = 50
@@ -235,6 +351,7 @@ class TaskExtractor:
 
         return sorted(tasks, key=sort_keys.get(sort_by, sort_keys['priority']), reverse=reverse)
 
+    @profiler.timed('extract_deadline')
     def _extract_deadline(self, text: str) -> Dict:
         """Extract deadline information using enhanced pattern matching."""
         result = {
@@ -0,0 +1,207 @@
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+from datetime import datetime
+import hashlib
+import sqlite3
+import json
+
+class TaskStore:
+    """On-disk task database keyed by (message ID, source)."""
+
+    # Keys owned by the user rather than by the extractor
+    STATUS_KEYS = ('status', 'completed', 'completion_date', 'last_modified')
+
+    def __init__(self, db_file: str = 'tasks.db'):
+        self.db_file = db_file
+        self.conn = sqlite3.connect(self.db_file)
+        self._create_tables()
+
+    def _create_tables(self):
+        with self.conn:
+            # Versions carry scanning modes (e.g. '5+body'); older stores declared the column INTEGER
+            columns = {row[1]: row[2] for row in self.conn.execute('PRAGMA table_info(processed_messages)')}
+            migrate = columns.get('extractor_version') == 'INTEGER'
+            if migrate:
+                self.conn.execute('ALTER TABLE processed_messages RENAME TO processed_messages_old')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS processed_messages (
+                    message_id TEXT PRIMARY KEY,
+                    extractor_version TEXT NOT NULL,
+                    processed_at TEXT NOT NULL
+                )''')
+            if migrate:
+                self.conn.execute('''
+                    INSERT INTO processed_messages
+                    SELECT message_id, CAST(extractor_version AS TEXT), processed_at FROM processed_messages_old''')
+                self.conn.execute('DROP TABLE processed_messages_old')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS tasks (
+                    message_id TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    completion_date TEXT,
+                    last_modified TEXT,
+                    PRIMARY KEY (message_id, source)
+                )''')
+            # MinHash signatures of task text, so near-duplicate detection only hashes new tasks
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS task_signatures (
+                    message_id TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    signature BLOB NOT NULL,
+                    PRIMARY KEY (message_id, source)
+                )''')
+            # Which message a thread's task came from, so later syncs do not repeat it for replies
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS thread_tasks (
+                    thread TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    message_id TEXT NOT NULL,
+                    PRIMARY KEY (thread, source, text_hash)
+                )''')
+            self.conn.execute(
+                'CREATE INDEX IF NOT EXISTS thread_tasks_message ON thread_tasks (message_id)')
+
+    def close(self):
+        self.conn.close()
+
+    def unprocessed(self, emails: List[Dict], extractor_version: str,
+                    max_reextract: Optional[int] = None) -> Tuple[List[Dict], List[Dict]]:
+        """Return (new, stale) emails: never extracted, or extracted by another extractor version.
+
+        All new messages are returned, and at most max_reextract stale ones.
+        """
+        # Look up only these emails, so callers can pass one chunk at a time
+        versions = {}
+        ids = [email['id'] for email in emails]
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            versions.update(self.conn.execute(
+                f'SELECT message_id, extractor_version FROM processed_messages '
+                f'WHERE message_id IN ({",".join("?" * len(chunk))})', chunk))
+
+        new_emails = []
+        stale_emails = []
+        for email in emails:
+            version = versions.get(email['id'])
+            if version is None:
+                new_emails.append(email)
+            elif version != extractor_version:
+                stale_emails.append(email)
+
+        if max_reextract is not None:
+            stale_emails = stale_emails[:max_reextract]
+        return new_emails, stale_emails
+
+    @staticmethod
+    def _text_hash(text: str) -> str:
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def thread_task_owner(self, thread: str, source: str, text: str) -> Optional[str]:
+        """ID of the message whose task claimed (thread, source, text), if any."""
+        row = self.conn.execute(
+            'SELECT message_id FROM thread_tasks WHERE thread = ? AND source = ? AND text_hash = ?',
+            (thread, source, self._text_hash(text))).fetchone()
+        return row[0] if row else None
+
+    def save_extraction(self, emails: List[Dict], tasks: List[Dict], extractor_version: str,
+                        thread_keys: Optional[Dict] = None):
+        """Store extraction results for emails, keeping any status set by the user.
+
+        thread_keys maps (thread, source, text) task keys to the message that claimed them.
+        """
+        now = datetime.now().isoformat()
+        tasks_by_message = {}
+        for task in tasks:
+            tasks_by_message.setdefault(task['message_id'], []).append(task)
+
+        with self.conn:
+            for email in emails:
+                message_id = email['id']
+                message_tasks = tasks_by_message.get(message_id, [])
+
+                # Drop tasks the current extractor no longer produces
+                sources = [task['source'] for task in message_tasks]
+                placeholders = ','.join('?' * len(sources))
+                self.conn.execute(
+                    f'DELETE FROM tasks WHERE message_id = ? AND source NOT IN ({placeholders})',
+                    [message_id] + sources)
+                # Task text may have changed, so its signature is recomputed on next load
+                self.conn.execute('DELETE FROM task_signatures WHERE message_id = ?', (message_id,))
+                self.conn.execute('DELETE FROM thread_tasks WHERE message_id = ?', (message_id,))
+
+                for task in message_tasks:
+                    data = {k: v for k, v in task.items() if k not in self.STATUS_KEYS}
+                    self.conn.execute('''
+                        INSERT INTO tasks (message_id, source, data, status)
+                        VALUES (?, ?, ?, ?)
+                        ON CONFLICT (message_id, source) DO UPDATE SET data = excluded.data''',
+                        (message_id, task['source'], json.dumps(data), task.get('status', 'pending')))
+
+                self.conn.execute('''
+                    INSERT OR REPLACE INTO processed_messages (message_id, extractor_version, processed_at)
+                    VALUES (?, ?, ?)''', (message_id, extractor_version, now))
+
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO thread_tasks (thread, source, text_hash, message_id) VALUES (?, ?, ?, ?)',
+                [(thread, source, self._text_hash(text), message_id)
+                 for (thread, source, text), message_id in (thread_keys or {}).items()])
+
+    def _row_to_task(self, data: str, status: str, completion_date: Optional[str],
+                     last_modified: Optional[str]) -> Dict:
+        task = json.loads(data)
+        task['status'] = status
+        task['completed'] = status == 'completed'
+        if completion_date:
+            task['completion_date'] = completion_date
+        if last_modified:
+            task['last_modified'] = last_modified
+        return task
+
+    def load_tasks(self, message_ids: Optional[Iterable[str]] = None) -> List[Dict]:
+        """Load stored tasks with their user status, optionally limited to some messages."""
+        query = 'SELECT data, status, completion_date, last_modified FROM tasks'
+        if message_ids is None:
+            return [self._row_to_task(*row) for row in self.conn.execute(query)]
+
+        tasks = []
+        ids = list(dict.fromkeys(message_ids))
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            rows = self.conn.execute(f'{query} WHERE message_id IN ({",".join("?" * len(chunk))})', chunk)
+            tasks.extend(self._row_to_task(*row) for row in rows)
+        return tasks
+
+    def iter_task_chunks(self, chunk_size: int = 500) -> Iterator[List[Dict]]:
+        """Yield stored tasks in chunks without loading the whole table."""
+        cursor = self.conn.execute(
+            'SELECT data, status, completion_date, last_modified FROM tasks ORDER BY message_id, source')
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield [self._row_to_task(*row) for row in rows]
+
+    def load_signatures(self) -> Dict:
+        """Stored task signatures keyed by (message_id, source)."""
+        return {(message_id, source): signature for message_id, source, signature in
+                self.conn.execute('SELECT message_id, source, signature FROM task_signatures')}
+
+    def save_signatures(self, signatures: Dict):
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO task_signatures (message_id, source, signature) VALUES (?, ?, ?)',
+                [(message_id, source, signature) for (message_id, source), signature in signatures.items()])
+
+    def update_status(self, task: Dict):
+        """Persist the user status of a task, and of the near-duplicates collapsed into it."""
+        if 'message_id' not in task:
+            return
+        keys = [[task['message_id'], task['source']]] + task.get('duplicate_keys', [])
+        with self.conn:
+            self.conn.executemany('''
+                UPDATE tasks SET status = ?, completion_date = ?, last_modified = ?
+                WHERE message_id = ? AND source = ?''',
+                [(task.get('status', 'pending'), task.get('completion_date'),
+                  task.get('last_modified'), message_id, source) for message_id, source in keys])
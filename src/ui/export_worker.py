@@ -0,0 +1,22 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+from tasks.task_export import TaskExporter, iter_chunks
+
+class ExportWorker(QThread):
+    """Runs a task export off the GUI thread and reports progress."""
+    progress = pyqtSignal(int)
+    export_finished = pyqtSignal(int)
+    export_failed = pyqtSignal(str)
+
+    def __init__(self, exporter: TaskExporter, tasks=None, chunk_size=500):
+        super().__init__()
+        self.exporter = exporter
+        self.tasks = tasks or []
+        self.chunk_size = chunk_size
+
+    def run(self):
+        try:
+            count = self.exporter.export(iter_chunks(self.tasks, self.chunk_size), progress=self.progress.emit)
+        except Exception as e:
+            self.export_failed.emit(str(e))
+            return
+        self.export_finished.emit(count)
@@ -1,17 +1,25 @@
-from PyQt6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QLabel, QTabWidget, QHeaderView, QComboBox, QPushButton, QFileDialog, QApplication
-from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QLabel, QTabWidget, QHeaderView, QComboBox, QPushButton, QFileDialog, QApplication, QMenu, QLineEdit, QMessageBox
+from PyQt6.QtCore import Qt, QEvent
 from datetime import datetime, timedelta
+from difflib import SequenceMatcher
 import plotly.graph_objects as go
-import csv
-import json
+from tasks.task_export import TaskExporter
+from tasks.task_extractor import TaskExtractor
+from metrics.profiler import profiler
+from ui.export_worker import ExportWorker
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, task_store=None, search_index=None):
         super().__init__()
+        self.task_store = task_store
+        self.search_index = search_index
+        self.task_extractor = TaskExtractor()
         self.setWindowTitle("Email Analytics Dashboard")
         self.setGeometry(100, 100, 1200, 800)
         self.tasks = []
         self.original_tasks = []  # Store original tasks
+        self.sync_scheduler = None
+        self.row_values = []  # What each table row currently shows, to redraw only rows that change
         
         # Create main widget and layout
         main_widget = QWidget()
@@ -49,6 +57,15 @@ class MainWindow(QMainWindow):
         
         controls_layout.addWidget(filter_group)
         
+        # Full-text search box
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText('Search emails and tasks ("phrase", prefix*)')
+        self.search_box.setClearButtonEnabled(True)
+        self.search_box.returnPressed.connect(self.apply_filters)
+        self.search_box.textChanged.connect(lambda text: text or self.apply_filters())
+        self.search_box.setEnabled(self.search_index is not None)
+        controls_layout.addWidget(self.search_box)
+        
         # Sort controls
         sort_group = QWidget()
         sort_layout = QHBoxLayout(sort_group)
@@ -133,6 +150,52 @@ class MainWindow(QMainWindow):
         
         tab_widget.addTab(analytics_tab, "Analytics")
     
+    def display_snapshot(self, snapshot):
+        self.display_tasks(snapshot['tasks'])
+        self.display_analytics(snapshot['response_times'], snapshot['patterns'])
+        self.statusBar().showMessage(f"Showing snapshot from {snapshot['created'][:16].replace('T', ' ')}, syncing...")
+    
+    def start_sync(self, sync_scheduler):
+        """Sync in the background now and then on sync_scheduler's timer, swapping in results as they come."""
+        self.sync_scheduler = sync_scheduler
+        sync_scheduler.synced.connect(self.on_synced)
+        sync_scheduler.up_to_date.connect(self.on_up_to_date)
+        sync_scheduler.sync_failed.connect(self.on_sync_failed)
+        if not self.original_tasks:
+            self.statusBar().showMessage("Syncing with Gmail...")
+        sync_scheduler.set_visible(self.isVisible() and not self.isMinimized())
+        sync_scheduler.start()
+    
+    def on_synced(self, tasks, response_times, patterns):
+        self.display_tasks(tasks)
+        self.display_analytics(response_times, patterns)
+        self.on_up_to_date()
+    
+    def on_up_to_date(self):
+        self.statusBar().showMessage(f"Up to date as of {datetime.now().strftime('%H:%M')}")
+    
+    def on_sync_failed(self, message):
+        print(message)
+        self.statusBar().showMessage(message)
+    
+    # Background syncs pause while the window is hidden or minimized
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.update_sync_visibility()
+    
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.update_sync_visibility()
+    
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.Type.WindowStateChange:
+            self.update_sync_visibility()
+    
+    def update_sync_visibility(self):
+        if self.sync_scheduler:
+            self.sync_scheduler.set_visible(self.isVisible() and not self.isMinimized())
+    
     def display_tasks(self, tasks):
         self.tasks = tasks
         self.original_tasks = tasks.copy()  # Store a copy of original tasks
@@ -149,17 +212,18 @@ class MainWindow(QMainWindow):
         
         filtered_tasks = self.original_tasks.copy()  # Use original tasks as base
         if filters:
-            from tasks.task_extractor import TaskExtractor
-            task_extractor = TaskExtractor()
-            filtered_tasks = task_extractor.filter_tasks(filtered_tasks, filters)
+            filtered_tasks = self.task_extractor.filter_tasks(filtered_tasks, filters)
+        
+        query = self.search_box.text().strip()
+        if query and self.search_index:
+            matching_ids = set(self.search_index.search_message_ids(query))
+            filtered_tasks = [t for t in filtered_tasks if t.get('message_id') in matching_ids]
         
         self.tasks = filtered_tasks  # Update current tasks
         self.update_task_table(filtered_tasks)
     
     def apply_sort(self):
-        from tasks.task_extractor import TaskExtractor
-        task_extractor = TaskExtractor()
-        sorted_tasks = task_extractor.prioritize_tasks(
+        sorted_tasks = self.task_extractor.prioritize_tasks(
             self.tasks,
             sort_by=self.sort_by.currentText().lower()
         )
@@ -176,11 +240,13 @@ class MainWindow(QMainWindow):
     
     def mark_task_completed(self, row):
         task = self.tasks[row]
-        task['status'] = 'completed'
+        self.task_extractor.update_task_status(task, 'completed')
+        if self.task_store:
+            self.task_store.update_status(task)
         self.apply_filters()
 
+    @profiler.timed('ui.update_task_table')
     def update_task_table(self, tasks):
-        self.task_table.setRowCount(0)
         current_time = datetime.now()
         active_tasks = []
         
@@ -208,59 +274,77 @@ class MainWindow(QMainWindow):
         # Update the tasks list with only active tasks
         self.tasks = active_tasks
         
-        for task in active_tasks:
-            row = self.task_table.rowCount()
-            self.task_table.insertRow(row)
-            
-            # Priority column with persistent color
-            priority = 'low' if not task.get('deadline') else task['priority']
-            priority_item = QTableWidgetItem(priority.upper())
-            if priority.lower() == 'high':
-                priority_item.setBackground(Qt.GlobalColor.red)
-            elif priority.lower() == 'moderate':
-                priority_item.setBackground(Qt.GlobalColor.yellow)
-            else:
-                priority_item.setBackground(Qt.GlobalColor.white)
-            self.task_table.setItem(row, 0, priority_item)
-            
-            # Task description column with deadline context
-            description = task['text']
-            description_item = QTableWidgetItem(description)
-            description_item.setTextAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft)
-            self.task_table.setItem(row, 1, description_item)
-            
-            # Deadline column with formatting and warning indicator
-            deadline = task.get('deadline', '')
-            if deadline:
-                try:
-                    deadline_date = datetime.fromisoformat(deadline)
-                    deadline_str = deadline_date.strftime('%Y-%m-%d %H:%M')
-                    deadline_item = QTableWidgetItem(deadline_str)
-                    if task.get('approaching_deadline'):
-                        deadline_item.setBackground(Qt.GlobalColor.yellow)
-                        deadline_item.setToolTip("Deadline approaching within 24 hours!")
-                    self.task_table.setItem(row, 2, deadline_item)
-                except ValueError:
-                    self.task_table.setItem(row, 2, QTableWidgetItem(deadline))
-            else:
-                self.task_table.setItem(row, 2, QTableWidgetItem(''))
-            
-            # Status column with persistent color
-            status = task.get('status', 'pending')
-            status_item = QTableWidgetItem(status.capitalize())
-            if status.lower() == 'completed':
-                status_item.setBackground(Qt.GlobalColor.green)
-                status_item.setForeground(Qt.GlobalColor.white)
-            else:
-                status_item.setBackground(Qt.GlobalColor.lightGray)
-                status_item.setForeground(Qt.GlobalColor.black)
-            self.task_table.setItem(row, 3, status_item)
-            
-            # From column
-            from_email = task.get('from', '')
-            from_item = QTableWidgetItem(from_email)
-            from_item.setBackground(Qt.GlobalColor.white)
-            self.task_table.setItem(row, 4, from_item)
+        # Only insert, remove or redraw the rows whose content changed, e.g. after a delta sync
+        row_values = [self.task_row_values(task) for task in active_tasks]
+        matcher = SequenceMatcher(None, self.row_values, row_values, autojunk=False)
+        # In reverse, so edits do not shift the rows of opcodes still to apply
+        for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+            if tag == 'equal':
+                continue
+            for _ in range(i2 - i1):
+                self.task_table.removeRow(i1)
+            for offset, values in enumerate(row_values[j1:j2]):
+                self.task_table.insertRow(i1 + offset)
+                self.set_task_row(i1 + offset, values)
+        self.row_values = row_values
+    
+    @staticmethod
+    def task_row_values(task):
+        """Everything a task's table row shows, as a comparable tuple."""
+        priority = 'low' if not task.get('deadline') else task['priority']
+        deadline = task.get('deadline', '')
+        if deadline:
+            try:
+                deadline = datetime.fromisoformat(deadline).strftime('%Y-%m-%d %H:%M')
+            except ValueError:
+                pass
+        from_email = task.get('from', '')
+        # Near-duplicates collapsed into this task, e.g. a recurring notification
+        # Tasks that were never collapsed have no count (None once they went through a snapshot)
+        if (task.get('duplicate_count') or 1) > 1:
+            from_email += f"  (+{task['duplicate_count'] - 1} similar)"
+        return (priority, task['text'], deadline, bool(task.get('approaching_deadline')),
+                task.get('status', 'pending'), from_email)
+    
+    def set_task_row(self, row, values):
+        priority, description, deadline, approaching_deadline, status, from_email = values
+        
+        # Priority column with persistent color
+        priority_item = QTableWidgetItem(priority.upper())
+        if priority.lower() == 'high':
+            priority_item.setBackground(Qt.GlobalColor.red)
+        elif priority.lower() == 'moderate':
+            priority_item.setBackground(Qt.GlobalColor.yellow)
+        else:
+            priority_item.setBackground(Qt.GlobalColor.white)
+        self.task_table.setItem(row, 0, priority_item)
+        
+        # Task description column with deadline context
+        description_item = QTableWidgetItem(description)
+        description_item.setTextAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft)
+        self.task_table.setItem(row, 1, description_item)
+        
+        # Deadline column with formatting and warning indicator
+        deadline_item = QTableWidgetItem(deadline)
+        if approaching_deadline:
+            deadline_item.setBackground(Qt.GlobalColor.yellow)
+            deadline_item.setToolTip("Deadline approaching within 24 hours!")
+        self.task_table.setItem(row, 2, deadline_item)
+        
+        # Status column with persistent color
+        status_item = QTableWidgetItem(status.capitalize())
+        if status.lower() == 'completed':
+            status_item.setBackground(Qt.GlobalColor.green)
+            status_item.setForeground(Qt.GlobalColor.white)
+        else:
+            status_item.setBackground(Qt.GlobalColor.lightGray)
+            status_item.setForeground(Qt.GlobalColor.black)
+        self.task_table.setItem(row, 3, status_item)
+        
+        # From column
+        from_item = QTableWidgetItem(from_email)
+        from_item.setBackground(Qt.GlobalColor.white)
+        self.task_table.setItem(row, 4, from_item)
     
     def on_task_edited(self, item):
         if not item:
@@ -275,9 +359,9 @@ class MainWindow(QMainWindow):
         elif col == 2:  # Deadline
             task['deadline'] = item.text()
         elif col == 3:  # Status
-            from tasks.task_extractor import TaskExtractor
-            task_extractor = TaskExtractor()
-            task_extractor.update_task_status(task, item.text().lower())
+            self.task_extractor.update_task_status(task, item.text().lower())
+            if self.task_store:
+                self.task_store.update_status(task)
             
             if item.text().lower() == 'completed':
                 item.setBackground(Qt.GlobalColor.green)
@@ -289,28 +373,52 @@ class MainWindow(QMainWindow):
             self,
             "Export Tasks",
             "",
-            "CSV Files (*.csv);;JSON Files (*.json)"
+            "CSV Files (*.csv);;JSON Lines Files (*.jsonl);;Parquet Files (*.parquet);;"
+            "Compressed CSV Files (*.csv.gz);;Compressed JSON Lines Files (*.jsonl.gz)"
         )
         
         if not file_name:
             return
-            
-        if file_name.endswith('.csv'):
-            with open(file_name, 'w', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=['priority', 'text', 'deadline', 'status', 'from'])
-                writer.writeheader()
-                writer.writerows(self.tasks)
-        elif file_name.endswith('.json'):
-            with open(file_name, 'w') as f:
-                json.dump(self.tasks, f, indent=2)
+        
+        try:
+            exporter = TaskExporter(file_name)
+        except ValueError as e:
+            QMessageBox.warning(self, "Export Tasks", str(e))
+            return
+        
+        # Export the rows as shown: near-duplicates collapsed, with the cluster's count and deadline.
+        # Copied so edits made while the export runs do not reach the worker thread.
+        self.export_worker = ExportWorker(exporter, tasks=[dict(task) for task in self.tasks])
+        
+        self.export_worker.progress.connect(
+            lambda count: self.statusBar().showMessage(f"Exported {count} tasks..."))
+        self.export_worker.export_finished.connect(self.on_export_finished)
+        self.export_worker.export_failed.connect(self.on_export_failed)
+        self.export_btn.setEnabled(False)
+        self.export_worker.start()
+    
+    def on_export_finished(self, count):
+        self.export_btn.setEnabled(True)
+        self.statusBar().showMessage(f"Exported {count} tasks", 5000)
     
+    def on_export_failed(self, message):
+        self.export_btn.setEnabled(True)
+        self.statusBar().clearMessage()
+        QMessageBox.warning(self, "Export Tasks", f"Export failed: {message}")
+    
+    @profiler.timed('ui.display_analytics')
     def display_analytics(self, response_times, patterns):
         # Display response times with HTML formatting
         response_text = "<h3>Response Time Analysis</h3>"
         response_text += f"<p><b>Average response time:</b> {response_times['average']:.2f} hours</p>"
+        if response_times.get('median') is not None and response_times.get('count'):
+            response_text += f"<p><b>Median response time:</b> {response_times['median']:.2f} hours " \
+                             f"(90% within {response_times['p90']:.2f} hours)</p>"
         response_text += f"<p><b>Fastest response:</b> {response_times['min']:.2f} hours</p>"
         response_text += f"<p><b>Slowest response:</b> {response_times['max']:.2f} hours</p>"
-        self.response_times_widget.setText(response_text)
+        # Panels are only re-rendered when a sync actually changed them
+        if response_text != self.response_times_widget.text():
+            self.response_times_widget.setText(response_text)
         self.response_times_widget.setTextFormat(Qt.TextFormat.RichText)
         
         # Display communication patterns with HTML formatting
@@ -322,13 +430,15 @@ class MainWindow(QMainWindow):
         for contact, count in patterns['frequent_contacts'].items():
             patterns_text += f"<p>{contact}: <b>{count}</b> emails</p>"
         
-        self.patterns_widget.setText(patterns_text)
+        if patterns_text != self.patterns_widget.text():
+            self.patterns_widget.setText(patterns_text)
         self.patterns_widget.setTextFormat(Qt.TextFormat.RichText)
         self.patterns_widget.setWordWrap(True)
 
     def logout(self):
         # Clear the task table and cache
         self.task_table.setRowCount(0)
+        self.row_values = []
         self.tasks = []
         self.original_tasks = []
         
@@ -336,12 +446,18 @@ class MainWindow(QMainWindow):
         self.priority_filter.setCurrentText('All')
         self.status_filter.setCurrentText('All')
         self.sort_by.setCurrentText('Priority')
+        self.search_box.clear()
         
         # Clear analytics
         self.response_times_widget.setText('')
         self.patterns_widget.setText('')
         
     def refresh_data(self):
+        # Fetch new mail now instead of waiting for the next scheduled sync
+        if self.sync_scheduler:
+            self.statusBar().showMessage("Syncing with Gmail...")
+            self.sync_scheduler.sync_now()
+            return
         # Re-apply filters and sort to refresh the task table
         self.apply_filters()
         self.apply_sort()
@@ -0,0 +1,188 @@
+from typing import Callable
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from PyQt6.QtGui import QCursor
+from ui.sync_worker import SyncWorker
+import random
+import time
+
+class SyncScheduler(QObject):
+    """Keeps the dashboard current with periodic background syncs.
+
+    The first sync fetches the whole window; later ones are delta syncs that
+    only fetch mail added since (see SyncWorker), with a full sync every
+    full_sync_every syncs to let old mail age out. Syncs run every interval
+    seconds, give or take jitter, and back off exponentially after failures.
+    They pause while the window is hidden or the user is idle, and catch up
+    as soon as the window is back in use.
+
+    Mail tends to arrive in bursts, so a sync that finds new mail is followed
+    up after debounce seconds, and results reach the UI as one update once a
+    follow-up comes back empty or max_wait has passed.
+    """
+    synced = pyqtSignal(list, dict, dict)
+    up_to_date = pyqtSignal()
+    sync_failed = pyqtSignal(str)
+
+    def __init__(self, make_worker: Callable[..., SyncWorker], interval: float = 300, jitter: float = 0.1,
+                 max_backoff: float = 3600, debounce: float = 10, max_wait: float = 60,
+                 idle_after: float = 900, full_sync_every: int = 24, parent=None):
+        super().__init__(parent)
+        self.make_worker = make_worker
+        self.interval = interval  # 0 disables periodic syncs; sync_now still works
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.idle_after = idle_after
+        self.full_sync_every = full_sync_every
+
+        self.worker = None
+        self.full_sync = False
+        self.history_id = None
+        self.stats = None
+        self.message_ids = []
+        self.deltas = 0
+        self.failures = 0
+        self.changed = False
+        self.error = None
+        self.urgent = False  # Show the result of a manual refresh right away
+        self.rerun = False  # A sync was requested while one was running
+        self.due = False  # A sync came due while paused
+        self.pending = None  # Latest (tasks, response_times, patterns) held back by the debounce
+        self.pending_since = None
+
+        self.hidden = False
+        self.last_activity = time.monotonic()
+        self.cursor_pos = QCursor.pos()
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._tick)
+        # Qt has no portable idle API; a cursor that has not moved anywhere on screen is a cheap proxy
+        self.activity_timer = QTimer(self)
+        self.activity_timer.timeout.connect(self._check_activity)
+
+    def start(self):
+        self.activity_timer.start(30000)
+        self.sync_now()
+
+    def stop(self):
+        """Stop scheduling and wait for a running sync, e.g. before the app quits."""
+        self.timer.stop()
+        self.activity_timer.stop()
+        if self.worker is not None:
+            self.worker.wait()
+
+    def sync_now(self):
+        self.urgent = True
+        self.due = False
+        self.timer.stop()
+        self._run()
+
+    def set_visible(self, visible: bool):
+        self.hidden = not visible
+        if visible:
+            self._user_active()
+
+    def _check_activity(self):
+        pos = QCursor.pos()
+        if pos != self.cursor_pos:
+            self.cursor_pos = pos
+            self._user_active()
+
+    def _user_active(self):
+        self.last_activity = time.monotonic()
+        if self.due and not self.hidden:
+            self.due = False
+            self._run()
+
+    def _paused(self) -> bool:
+        return self.hidden or time.monotonic() - self.last_activity > self.idle_after
+
+    def _tick(self):
+        if self._paused():
+            self.due = True
+            return
+        self._run()
+
+    def _run(self):
+        if self.worker is not None:
+            self.rerun = True
+            return
+
+        self.full_sync = self.stats is None or self.history_id is None or self.deltas >= self.full_sync_every
+        if self.full_sync:
+            self.deltas = 0
+            worker = self.make_worker()
+        else:
+            self.deltas += 1
+            worker = self.make_worker(start_history_id=self.history_id, stats=self.stats,
+                                      message_ids=self.message_ids)
+        self.changed = False
+        self.error = None
+        worker.synced.connect(self._on_synced)
+        worker.unchanged.connect(self._on_unchanged)
+        worker.sync_failed.connect(self._on_failed)
+        worker.finished.connect(self._on_finished)
+        self.worker = worker
+        worker.start()
+
+    def _on_synced(self, tasks, response_times, patterns):
+        self.pending = (tasks, response_times, patterns)
+        if self.pending_since is None:
+            self.pending_since = time.monotonic()
+        self.changed = True
+        self.failures = 0
+
+    def _on_unchanged(self):
+        self.failures = 0
+
+    def _on_failed(self, message):
+        self.failures += 1
+        self.error = message
+
+    def _on_finished(self):
+        worker = self.worker
+        self.worker = None
+        # A failed delta keeps the previous history ID; a worker that dropped its stats forces a full sync
+        if worker.history_id:
+            self.history_id = worker.history_id
+        self.stats = worker.stats
+        self.message_ids = worker.message_ids
+
+        if self.error:
+            self._flush()
+            self.sync_failed.emit(self.error)
+            delay = min(self.max_backoff, self.interval * 2 ** self.failures)
+        elif not self.changed:
+            if self.pending:
+                self._flush()
+            else:
+                self.up_to_date.emit()
+            delay = self.interval
+        elif self.full_sync or self.urgent or time.monotonic() - self.pending_since >= self.max_wait:
+            self._flush()
+            delay = self.interval
+        else:
+            # More of the burst may be on its way; check again soon before updating the UI
+            delay = self.debounce
+        self.urgent = False
+
+        if self.rerun:
+            self.rerun = False
+            self._schedule(0)
+        elif self.interval:
+            self._schedule(delay)
+        else:
+            # Periodic syncs are off, so there is no follow-up to wait for
+            self._flush()
+
+    def _flush(self):
+        if self.pending:
+            self.synced.emit(*self.pending)
+        self.pending = None
+        self.pending_since = None
+
+    def _schedule(self, delay: float):
+        delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        self.timer.start(int(delay * 1000))
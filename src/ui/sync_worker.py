@@ -0,0 +1,114 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+from analytics.email_analyzer import EmailAnalyzer
+from tasks.task_extractor import TaskExtractor
+from tasks.task_store import TaskStore
+from tasks.prefilter import BulkMailFilter
+from tasks.dedup import TaskDeduplicator
+from search.search_index import SearchIndex
+from analytics.rollup import RollupStore
+from snapshot.dashboard_snapshot import write_snapshot
+from metrics.profiler import profiler
+from pipeline.ingest import ingest_emails
+
+class SyncWorker(QThread):
+    """Runs connect, fetch, extract, prioritize and analyze off the GUI thread.
+
+    Given start_history_id, the stats and message_ids of the previous sync,
+    only mail added since then is fetched (a delta sync) and folded into them;
+    otherwise the whole window is fetched. After a run, history_id, stats and
+    message_ids are the starting point for the next delta sync.
+    """
+    synced = pyqtSignal(list, dict, dict)
+    unchanged = pyqtSignal()  # Delta sync found no new mail
+    sync_failed = pyqtSignal(str)
+
+    def __init__(self, task_db, search_db, snapshot_file=None, months_back=2, query='', scan_body=False,
+                 prefilter=True, rollup_db='rollup.db', stats_mode='exact',
+                 dedup=True, filters=None, max_reextract=None, start_history_id=None, stats=None,
+                 message_ids=None):
+        super().__init__()
+        self.task_db = task_db
+        self.search_db = search_db
+        self.snapshot_file = snapshot_file
+        self.months_back = months_back
+        self.query = query
+        self.scan_body = scan_body
+        self.prefilter = prefilter
+        self.rollup_db = rollup_db
+        self.stats_mode = stats_mode
+        self.dedup = dedup
+        self.filters = filters
+        self.max_reextract = max_reextract
+        self.start_history_id = start_history_id
+        self.stats = stats
+        self.message_ids = list(message_ids or [])
+        self.history_id = None
+
+    def run(self):
+        email_analyzer = EmailAnalyzer(stats_mode=self.stats_mode)
+        task_extractor = TaskExtractor(scan_body=self.scan_body,
+                                       bulk_filter=BulkMailFilter() if self.prefilter else None,
+                                       deduplicator=TaskDeduplicator() if self.dedup else None)
+
+        if not email_analyzer.connect():
+            self.sync_failed.emit("Failed to connect to Gmail")
+            return
+
+        delta = self.start_history_id is not None and self.stats is not None
+        known = set(self.message_ids)
+        if delta:
+            # Mail that arrived during the previous fetch can show up again; count it once
+            emails = (email for email in email_analyzer.iter_new_emails(
+                self.start_history_id, query=self.query, filters=self.filters) if email['id'] not in known)
+            stats = self.stats
+        else:
+            # Taken before fetching so mail arriving during the fetch is picked up by the next delta sync
+            self.history_id = email_analyzer.history_id()
+            emails = email_analyzer.iter_emails(months_back=self.months_back, force_refresh=True, query=self.query,
+                                                filters=self.filters)
+            stats = email_analyzer.new_stats()
+
+        # SQLite connections cannot cross threads, so this worker opens its own
+        task_store = TaskStore(self.task_db)
+        search_index = SearchIndex(self.search_db)
+        rollup = RollupStore(self.rollup_db)
+        try:
+            # Emails stream through in chunks and are never held all at once
+            message_ids = ingest_emails(emails, task_extractor, task_store, stats,
+                                        sinks=[search_index.add_emails, rollup.add_emails],
+                                        max_reextract=self.max_reextract)
+            new_ids = set(message_ids)
+            if delta:
+                if email_analyzer.last_error:
+                    # Stats already hold part of this delta; retrying it would count that part twice
+                    if email_analyzer.history_expired or message_ids:
+                        self.stats = None
+                    self.sync_failed.emit(f"Sync failed: {email_analyzer.last_error}")
+                    return
+                self.history_id = email_analyzer.last_history_id
+                if not message_ids:
+                    self.unchanged.emit()
+                    return
+                message_ids = self.message_ids + message_ids
+            elif email_analyzer.last_error or not message_ids:
+                self.sync_failed.emit("No emails found or error occurred")
+                return
+            self.stats = stats
+            self.message_ids = message_ids
+            tasks = task_extractor.load_stored_tasks(message_ids, task_store)
+            with profiler.span('search_index'):
+                search_index.add_tasks([task for task in tasks if task['message_id'] in new_ids])
+        finally:
+            task_store.close()
+            search_index.close()
+            rollup.close()
+        prioritized_tasks = task_extractor.prioritize_tasks(tasks)
+
+        response_times = stats.response_times()
+        patterns = stats.patterns()
+
+        if self.snapshot_file:
+            with profiler.span('write_snapshot'):
+                write_snapshot(self.snapshot_file, prioritized_tasks, response_times, patterns)
+
+        self.synced.emit(prioritized_tasks, response_times, patterns)
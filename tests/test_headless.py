@@ -0,0 +1,48 @@
+import json
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from analytics.email_analyzer import EmailAnalyzer
+from headless import EXIT_OK, EXIT_AUTH_FAILED
+from main import parse_args
+import headless
+
+
+def fake_emails(count=20):
+    now = datetime.now(timezone.utc)
+    for i in range(count):
+        yield {
+            'id': f'm{i}',
+            'thread_id': f't{i % 5}',
+            'date': format_datetime(now - timedelta(hours=i * 7)),
+            'from': f'Sender {i % 3} <sender{i % 3}@example.com>',
+            'subject': f'Please review the report {i} by Friday',
+            'snippet': f'Can you send the numbers for item {i} before the meeting?',
+            'body': '',
+            'labels': ['INBOX', 'CATEGORY_PERSONAL'],
+            'list_unsubscribe': '',
+            'precedence': '',
+            'auto_submitted': ''
+        }
+
+
+def run(tmp_path, monkeypatch, connected=True):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(EmailAnalyzer, 'connect', lambda self, interactive=True: connected)
+    monkeypatch.setattr(EmailAnalyzer, 'iter_emails', lambda self, *args, **kwargs: fake_emails())
+    args, _ = parse_args(['--headless', '--output', str(tmp_path / 'out'),
+                          '--task-db', str(tmp_path / 'tasks.db'), '--rollup-db', str(tmp_path / 'rollup.db')])
+    return headless.run_headless(args)
+
+
+def test_headless_run_writes_tasks_and_analytics(tmp_path, monkeypatch):
+    assert run(tmp_path, monkeypatch) == EXIT_OK
+    tasks = [json.loads(line) for line in open(tmp_path / 'out' / 'tasks.jsonl')]
+    assert tasks and all(task['message_id'].startswith('m') for task in tasks)
+    metrics = {json.loads(line)['metric'] for line in open(tmp_path / 'out' / 'analytics.jsonl')}
+    assert 'week_over_week' in metrics
+    assert (tmp_path / 'tasks.db').exists() and (tmp_path / 'rollup.db').exists()
+
+
+def test_headless_run_reports_auth_failure(tmp_path, monkeypatch):
+    assert run(tmp_path, monkeypatch, connected=False) == EXIT_AUTH_FAILED
@@ -0,0 +1,28 @@
+import pytest
+
+from tasks.quote_stripper import strip_quoted_snippet
+
+
+@pytest.mark.parametrize('snippet, expected', [
+    ('Sounds good, I will send it Friday. On Mon, Oct 5, 2026 at 10:00 AM Alice Smith &lt;alice@example.com&gt; '
+     'wrote: Can you send the report?', 'Sounds good, I will send it Friday.'),
+    ('Done, see attached On 05/10/2026 10:00, Bob Jones wrote: please attach the file', 'Done, see attached'),
+    ('Works for me On Tue, 6 Oct 2026, bob@example.com wrote: does Tuesday work?', 'Works for me'),
+    ('Approved. From: Alice Smith Sent: Monday, October 5, 2026 To: Bob', 'Approved.'),
+    ('Looks fine -----Original Message----- From: Alice', 'Looks fine'),
+    ('Thanks, will do. &gt; Can you review the draft by Friday?', 'Thanks, will do.'),
+    ('&gt; Can you review the draft by Friday?', ''),
+])
+def test_strips_inline_quotes_and_attributions(snippet, expected):
+    assert strip_quoted_snippet(snippet) == expected
+
+
+@pytest.mark.parametrize('snippet', [
+    'Can you sign off on the spec Dana wrote: it is due by Friday',
+    'Please review the section on pricing that Priya wrote: we need comments by EOD',
+    'On the spec Dana wrote: please add a review by Friday',
+    'Please forward the note from: legal once the date: is confirmed',
+    'Check the alert fires when x &gt; 5 and y &gt; 3 before the release',
+])
+def test_keeps_new_content_that_looks_like_a_quote(snippet):
+    assert strip_quoted_snippet(snippet) == snippet.replace('&gt;', '>')
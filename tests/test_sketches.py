@@ -0,0 +1,231 @@
+import math
+import pickle
+import random
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from analytics.sketches import SpaceSaving, HyperLogLog, QuantileSketch
+from analytics.email_analyzer import EmailAnalyzer, EmailStats
+
+
+def zipf_stream(n, items, seed):
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(items)]
+    return rng.choices([f'sender{i}@example.com' for i in range(items)], weights, k=n)
+
+
+def exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def test_space_saving_error_bound():
+    stream = zipf_stream(20000, 2000, seed=1)
+    sketch = SpaceSaving.for_error(0.01)
+    for item in stream:
+        sketch.add(item)
+    exact = Counter(stream)
+    bound = sketch.total / sketch.capacity
+    for item, count in sketch.counts.items():
+        assert exact[item] <= count <= exact[item] + bound
+        assert count - sketch.errors[item] <= exact[item]
+    # Every item above the bound is guaranteed to be tracked
+    for item, count in exact.items():
+        if count > bound:
+            assert item in sketch.counts
+
+
+def test_space_saving_top_matches_exact_heavy_hitters():
+    stream = zipf_stream(20000, 2000, seed=2)
+    sketch = SpaceSaving.for_error(0.01)
+    for item in stream:
+        sketch.add(item)
+    assert list(sketch.top(5)) == [item for item, _ in Counter(stream).most_common(5)]
+
+
+def test_space_saving_merge_keeps_error_bound():
+    first, second = zipf_stream(10000, 2000, seed=3), zipf_stream(10000, 2000, seed=4)
+    sketches = [SpaceSaving.for_error(0.01), SpaceSaving.for_error(0.01)]
+    for sketch, stream in zip(sketches, (first, second)):
+        for item in stream:
+            sketch.add(item)
+    merged = sketches[0].merge(sketches[1])
+    exact = Counter(first + second)
+    assert merged.total == len(first) + len(second)
+    # Each input overestimates by at most its own total / capacity
+    bound = merged.total / merged.capacity
+    for item, count in merged.counts.items():
+        assert exact[item] <= count <= exact[item] + bound
+
+
+def test_hyperloglog_relative_error():
+    standard_error = 1.04 / math.sqrt(2 ** 12)
+    for n in (100, 10000, 100000):
+        sketch = HyperLogLog(precision=12)
+        for i in range(n):
+            sketch.add(f'sender{i}@example.com')
+        assert abs(sketch.count() - n) <= 4 * standard_error * n
+
+
+def test_hyperloglog_duplicates_do_not_count():
+    sketch = HyperLogLog(precision=10)
+    for _ in range(5):
+        for i in range(500):
+            sketch.add(f'sender{i}@example.com')
+    assert abs(sketch.count() - 500) <= 4 * 1.04 / math.sqrt(2 ** 10) * 500
+
+
+def test_hyperloglog_merge_equals_union():
+    first, second, union = HyperLogLog(12), HyperLogLog(12), HyperLogLog(12)
+    for i in range(30000):
+        item = f'sender{i}@example.com'
+        (first if i < 20000 else second).add(item)
+        if 10000 <= i:
+            first.add(item)
+        union.add(item)
+    merged = first.merge(second)
+    assert merged.registers == union.registers
+    assert abs(merged.count() - 30000) <= 4 * 1.04 / math.sqrt(2 ** 12) * 30000
+
+
+def test_hyperloglog_for_error_and_precision_mismatch():
+    assert 1.04 / math.sqrt(2 ** HyperLogLog.for_error(0.01).precision) <= 0.01
+    try:
+        HyperLogLog(10).merge(HyperLogLog(12))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('merging different precisions must fail')
+
+
+def test_quantile_sketch_relative_accuracy():
+    rng = random.Random(5)
+    values = [rng.lognormvariate(0, 2) for _ in range(20000)]
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+    for q in (0.01, 0.1, 0.5, 0.9, 0.99):
+        exact = exact_quantile(values, q)
+        assert abs(sketch.quantile(q) - exact) <= 0.01 * exact
+    assert sketch.count == len(values)
+    assert math.isclose(sketch.sum, sum(values))
+    assert sketch.min == min(values) and sketch.max == max(values)
+
+
+def test_quantile_sketch_zeros_and_empty():
+    assert QuantileSketch().quantile(0.5) is None
+    sketch = QuantileSketch()
+    for value in [0] * 60 + [5] * 40:
+        sketch.add(value)
+    assert sketch.quantile(0.5) == 0.0
+    assert abs(sketch.quantile(0.9) - 5) <= 0.01 * 5
+
+
+def test_quantile_sketch_merge_matches_single_sketch():
+    rng = random.Random(6)
+    values = [rng.expovariate(0.1) for _ in range(20000)]
+    whole, first, second = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    for i, value in enumerate(values):
+        whole.add(value)
+        (first if i % 2 else second).add(value)
+    merged = first.merge(second)
+    assert merged.count == whole.count and merged.buckets == whole.buckets
+    for q in (0.5, 0.9, 0.99):
+        exact = exact_quantile(values, q)
+        assert abs(merged.quantile(q) - exact) <= 0.01 * exact
+
+
+def test_quantile_sketch_collapse_keeps_high_quantiles():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(0, 4) for _ in range(20000)]
+    sketch = QuantileSketch(relative_accuracy=0.01, max_buckets=512)
+    for value in values:
+        sketch.add(value)
+    assert len(sketch.buckets) <= 512
+    # The values span far more than 512 buckets; only the low end is folded
+    for q in (0.99, 0.999):
+        exact = exact_quantile(values, q)
+        assert abs(sketch.quantile(q) - exact) <= 0.01 * exact
+
+
+def test_sketches_pickle():
+    for sketch in (SpaceSaving(10), HyperLogLog(8), QuantileSketch()):
+        sketch.add('a@example.com' if not isinstance(sketch, QuantileSketch) else 1.5)
+        assert pickle.loads(pickle.dumps(sketch)).__dict__ == sketch.__dict__
+
+
+def thread_emails(threads, seed):
+    """Newest-first emails for threads of back-and-forth replies, as fetches yield them."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    emails = []
+    for thread in range(threads):
+        date = start + timedelta(hours=rng.uniform(0, 24 * 60))
+        for position in range(rng.randint(1, 6)):
+            date += timedelta(hours=rng.uniform(0.1, 48))
+            emails.append({
+                'id': f'{thread}-{position}',
+                'thread_id': str(thread),
+                'subject': f'Thread {thread}',
+                'date': date.strftime('%a, %d %b %Y %H:%M:%S %z'),
+                'from': f'person{(thread + position % 2)}@example.com'
+            })
+    emails.sort(key=lambda e: datetime.strptime(e['date'], '%a, %d %b %Y %H:%M:%S %z'), reverse=True)
+    return emails
+
+
+def test_email_stats_sketch_matches_exact_response_times():
+    emails = thread_emails(2000, seed=8)
+    exact = EmailStats('exact')
+    sketch = EmailStats('sketch', stats_error=0.01)
+    exact.add_all(emails)
+    sketch.add_all(emails)
+    exact_times, sketch_times = exact.response_times(), sketch.response_times()
+    assert sketch_times['count'] == exact_times['count']
+    for key in ('median', 'p90'):
+        assert abs(sketch_times[key] - exact_times[key]) <= 0.01 * exact_times[key]
+
+
+def test_email_stats_sketch_state_is_bounded():
+    emails = thread_emails(5000, seed=9)
+    exact = EmailStats('exact', patterns=False)
+    sketch = EmailStats('sketch', patterns=False, max_threads=1500)
+    exact.add_all(emails)
+    sketch.add_all(emails)
+    assert len(sketch.threads) <= 1500
+    assert sketch.response_times()['count'] == exact.response_times()['count']
+
+
+def test_email_stats_sketch_handles_newer_mail_after_a_full_fetch():
+    emails = thread_emails(500, seed=10)
+    exact = EmailStats('exact', patterns=False)
+    exact.add_all(emails)
+    # A delta sync adds the newest mail after the rest has been counted
+    sketch = EmailStats('sketch', patterns=False)
+    sketch.add_all(emails[100:])
+    sketch.add_all(reversed(emails[:100]))
+    assert sketch.response_times()['count'] == exact.response_times()['count']
+
+
+def test_merge_counts_across_accounts():
+    first, second = thread_emails(1000, seed=11), thread_emails(1000, seed=12)
+    for email in second:
+        email['thread_id'] = 'b' + email['thread_id']
+    analyzer = EmailAnalyzer.__new__(EmailAnalyzer)
+    analyzer.stats_mode, analyzer.stats_error = 'sketch', 0.01
+    response_counts = [analyzer.count_response_times(emails) for emails in (first, second)]
+    pattern_counts = [analyzer.count_communication_patterns(emails) for emails in (first, second)]
+
+    exact = EmailStats('exact')
+    exact.add_all(first + second)
+    merged_times = EmailAnalyzer.summarize_response_times(EmailAnalyzer.merge_response_counts(response_counts))
+    exact_times = exact.response_times()
+    assert merged_times['count'] == exact_times['count']
+    assert abs(merged_times['p90'] - exact_times['p90']) <= 0.01 * exact_times['p90']
+
+    merged_patterns = EmailAnalyzer.summarize_patterns(EmailAnalyzer.merge_pattern_counts(pattern_counts))
+    exact_patterns = exact.patterns()
+    assert merged_patterns['daily_volume'] == exact_patterns['daily_volume']
+    assert merged_patterns['peak_hours'] == exact_patterns['peak_hours']
+    for day, count in exact_patterns['daily_senders'].items():
+        assert abs(merged_patterns['daily_senders'][day] - count) <= max(1, 0.05 * count)